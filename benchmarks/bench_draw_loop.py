@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the main.py draw/mark loop.
+
+Plays every number of ROOMS concurrent rooms, round-robin, with PLAYERS players
+per room marking each number on their card, and reports the cost per draw of
+the old loop (list comprehension over 1-75 + set rebuild per mark) next to the
+current one (swap-remove pool + card bitmasks with counters).
+
+    python benchmarks/bench_draw_loop.py [--rooms 10000] [--players 4]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import draw_from_pool, mark_on_card, new_game, new_player  # noqa: E402
+
+
+def play_baseline(rooms, cards):
+    games = [{"drawn_numbers": [], "players": [{"cartela": card, "marked_numbers": set()} for card in room]}
+             for room in cards]
+    winners = 0
+    for _ in range(75):
+        for game in games[:rooms]:
+            number = random.choice([i for i in range(1, 76) if i not in game["drawn_numbers"]])
+            game["drawn_numbers"].append(number)
+            for player in game["players"]:
+                if number in player["cartela"]:
+                    player["marked_numbers"].add(number)
+                    if player["marked_numbers"] == set(player["cartela"]):
+                        winners += 1
+    return winners
+
+
+def play_current(rooms, cards):
+    games = []
+    for room in cards:
+        game = new_game("bench")
+        game["players"] = {index: new_player(card) for index, card in enumerate(room)}
+        games.append(game)
+    winners = 0
+    for _ in range(75):
+        for game in games[:rooms]:
+            number = draw_from_pool(game)
+            for player in game["players"].values():
+                if mark_on_card(player, number) and player["missing"] == 0:
+                    winners += 1
+    return winners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    cards = [[random.sample(range(1, 76), 25) for _ in range(args.players)] for _ in range(args.rooms)]
+    draws = args.rooms * 75
+    print(f"{args.rooms} rooms x {args.players} players, {draws} draws")
+    for name, play in (("baseline", play_baseline), ("current", play_current)):
+        started = time.perf_counter()
+        winners = play(args.rooms, cards)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>8}: {elapsed:7.2f}s total, {elapsed / draws * 1e6:6.2f} us/draw (winners: {winners})")
+
+
+if __name__ == "__main__":
+    main()
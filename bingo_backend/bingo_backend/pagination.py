@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over ``(timestamp column, id)``. Every ordering below is
+    backed by a composite index, so a page costs the same however deep it is.
+    """
+    page_size = settings.API_PAGINATION['PAGE_SIZE']
+    max_page_size = settings.API_PAGINATION['MAX_PAGE_SIZE']
+    page_size_query_param = 'page_size'
+
+
+class CreatedAtPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class TimestampPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class EndedAtPagination(KeysetPagination):
+    ordering = ('-ended_at', '-id')
+
+
+class DrawnAtPagination(KeysetPagination):
+    ordering = ('drawn_at', 'id')
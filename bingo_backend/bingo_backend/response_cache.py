@@ -0,0 +1,113 @@
+"""
+Read-through cache for hot read endpoints.
+
+Responses are cached per *scope* (e.g. ``session:<id>``, ``room:<code>``) under
+the scope's current version. Writes never delete entries: model signals call
+``invalidate(scope)``, which bumps the version so every cached response of the
+scope is skipped from then on and simply expires.
+
+The cached value is the response data, so a hit skips the ORM and the
+serializers; rendering (JSON, binary, ...) still follows content negotiation.
+"""
+import functools
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE['CACHE']]
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def uuid_scope(prefix, value):
+    """
+    Names the scope of an object keyed by a UUID, in canonical form, so
+    ``ABC...``, undashed and dashed spellings of an id share one version.
+    Returns None (no caching) if ``value`` is not a UUID.
+    """
+    try:
+        return f"{prefix}:{uuid.UUID(str(value))}"
+    except ValueError:
+        return None
+
+
+def _version_key(scope):
+    return f"resp-version:{scope}"
+
+
+def _version(scope):
+    version = _cache().get(_version_key(scope))
+    if version is None:
+        # A lost counter restarts from a fresh value, never from one already used
+        _cache().add(_version_key(scope), time.time_ns(), timeout=None)
+        version = _cache().get(_version_key(scope))
+    return version
+
+
+def _bump(scope):
+    try:
+        _cache().incr(_version_key(scope))
+    except ValueError:
+        _cache().add(_version_key(scope), time.time_ns(), timeout=None)
+
+
+def invalidate(scope):
+    """
+    Bumps the scope's version now and again once the current transaction
+    commits, so a read racing the write cannot keep the old data cached.
+    """
+    _count("invalidations")
+    _bump(scope)
+    transaction.on_commit(lambda: _bump(scope))
+
+
+def cached_response(scope):
+    """
+    Caches successful responses of a DRF view method. ``scope(view, request,
+    *args, **kwargs)`` names the scope, or returns None to bypass the cache.
+    Authentication and permissions still run before the method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            name = scope(self, request, *args, **kwargs)
+            if not name:
+                return method(self, request, *args, **kwargs)
+
+            url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+            key = f"resp:{name}:{_version(name)}:{url}"
+            data = _cache().get(key)
+            if data is not None:
+                _count("hits")
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count("misses")
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                _cache().set(key, response.data, settings.RESPONSE_CACHE['TIMEOUT'])
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
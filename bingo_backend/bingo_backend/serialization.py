@@ -0,0 +1,78 @@
+"""
+Fast path for large list responses.
+
+``ValuesSerializer`` reads a ModelSerializer's fields once and then turns
+``.values()`` rows into the same dicts the serializer would build from model
+instances, without creating instances or bound serializers per row. Only plain
+model fields, dotted sources (``actor.username``) and primary-key relations
+are supported.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class):
+        self.fields = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if (field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField))
+                    or (isinstance(field, serializers.RelatedField)
+                        and not isinstance(field, serializers.PrimaryKeyRelatedField))):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} cannot be read from .values()")
+            # DRF leaves the key out when a related object on the way is missing
+            skip_if_null = (len(field.source_attrs) > 1 and field.default is empty
+                            and not field.allow_null and not field.required)
+            # A primary-key relation is represented by the raw pk, which .values() already returns
+            represent = None if isinstance(field, serializers.RelatedField) else field.to_representation
+            self.fields.append((name, '__'.join(field.source_attrs), represent, skip_if_null))
+
+    @property
+    def lookups(self):
+        return [lookup for _, lookup, _, _ in self.fields]
+
+    def to_representation(self, row):
+        data = {}
+        for name, lookup, represent, skip_if_null in self.fields:
+            value = row[lookup]
+            if value is None:
+                if not skip_if_null:
+                    data[name] = None
+            else:
+                data[name] = value if represent is None else represent(value)
+        return data
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+_values_serializers = {}
+
+
+def values_serializer(serializer_class):
+    if serializer_class not in _values_serializers:
+        _values_serializers[serializer_class] = ValuesSerializer(serializer_class)
+    return _values_serializers[serializer_class]
+
+
+class FastListMixin:
+    """
+    Viewset mixin whose ``list`` serializes ``.values()`` rows when
+    ``settings.API_FAST_SERIALIZATION`` is on. The output is the same as the
+    regular serializer's, pagination links included.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        serializer = values_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.lookups)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(queryset))
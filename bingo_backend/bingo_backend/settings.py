@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -85,11 +88,124 @@ WSGI_APPLICATION = 'bingo_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_PROFILE picks the database setup:
+# - 'sqlite' (default): one file, for a single node. WAL lets reads run alongside the writer.
+# - 'server': PostgreSQL (or DB_ENGINE) with persistent, health-checked connections, or a
+#   connection pool with DB_POOL=1 (PostgreSQL only, see requirements-server.txt).
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    # Milliseconds a writer waits for the lock before failing with "database is locked"
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Negative values are KiB per connection
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+}
+
+# Also used by test_settings.py, whatever the profile
+SQLITE_DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Run on every new connection
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Every atomic() on the connection, read-only ones included, takes the write lock
+            # up front. A deferred transaction that reads first fails at once when it
+            # upgrades, whatever the busy timeout. Autocommit reads are not affected.
+            'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        },
+        # File-backed test database so concurrency tests get real per-thread connections
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+if DB_PROFILE == 'sqlite':
+    DATABASES = SQLITE_DATABASES
+elif DB_PROFILE == 'server':
+    DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
+            'NAME': os.environ.get('DB_NAME', 'bingo'),
+            'USER': os.environ.get('DB_USER', 'bingo'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # Django's pool replaces persistent connections, the two cannot be combined
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+                },
+            } if DB_POOL else {},
+        }
     }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE: {DB_PROFILE!r} (use 'sqlite' or 'server')")
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Per-session draw state (game_session/draw_state.py). Point it to a shared
+    # backend (e.g. django.core.cache.backends.redis.RedisCache) when running several workers.
+    'draw_state': {
+        'BACKEND': os.environ.get('DRAW_STATE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DRAW_STATE_CACHE_LOCATION', 'draw-state'),
+        'TIMEOUT': 60 * 60 * 6,
+    },
+    # Cached responses of hot read endpoints (bingo_backend/response_cache.py). Invalidation
+    # only reaches other workers through a shared backend, so configure one for those too.
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+DRAW_STATE_CACHE = 'draw_state'
+
+RESPONSE_CACHE = {
+    'CACHE': 'responses',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+
+# Audit log writer (users/audit.py)
+# 'buffered' batches AuditLog/GameAuditLog inserts; 'sync' (set in test_settings.py) writes them at once.
+
+AUDIT_LOG = {
+    'MODE': os.environ.get('AUDIT_LOG_MODE', 'buffered'),
+    'BATCH_SIZE': int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 200)),
+    'FLUSH_INTERVAL': float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0)),
+}
+
+# Game event log projections (game_session/events.py): 'sync' projects DrawnNumber
+# and GameHistory inside the request (test_settings.py), 'deferred' in batches after commit
+GAME_EVENTS = {
+    'PROJECTION': os.environ.get('GAME_EVENTS_PROJECTION', 'deferred'),
+    'BATCH_SIZE': int(os.environ.get('GAME_EVENTS_BATCH_SIZE', 200)),
+    'FLUSH_INTERVAL': float(os.environ.get('GAME_EVENTS_FLUSH_INTERVAL', 0.5)),
+}
+
+# Cold storage for old audit rows (users/archive.py, manage.py archive_audit_logs)
+AUDIT_ARCHIVE = {
+    'DIR': Path(os.environ.get('AUDIT_ARCHIVE_DIR', BASE_DIR / 'audit_archive')),
+    'MODELS': {
+        'users.AuditLog': 'users.serializers.AuditLogSerializer',
+        'game_session.GameAuditLog': 'game_session.serializers.GameAuditLogSerializer',
+    },
 }
 
 
@@ -142,3 +258,12 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',  # Só acessa se tiver autenticado
     ]
 }
+
+# Cursor pagination for list endpoints (bingo_backend/pagination.py)
+API_PAGINATION = {
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+    'MAX_PAGE_SIZE': int(os.environ.get('API_MAX_PAGE_SIZE', 500)),
+}
+
+# Build draw, audit log and card lists from .values() rows (bingo_backend/serialization.py)
+API_FAST_SERIALIZATION = os.environ.get('API_FAST_SERIALIZATION', '0') == '1'
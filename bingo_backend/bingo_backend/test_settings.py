@@ -0,0 +1,14 @@
+"""
+Settings for the test suite. ``manage.py test`` loads them by default; for
+pytest point ``DJANGO_SETTINGS_MODULE`` at this module (see README_TESTING.md).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import AUDIT_LOG, GAME_EVENTS, SQLITE_DATABASES
+
+# Audit entries and projections are written inside the request, so tests can assert on them
+AUDIT_LOG = {**AUDIT_LOG, 'MODE': 'sync'}
+GAME_EVENTS = {**GAME_EVENTS, 'PROJECTION': 'sync'}
+
+# Tests always run on SQLite, even with DB_PROFILE=server in the environment
+DB_PROFILE = 'sqlite'
+DATABASES = SQLITE_DATABASES
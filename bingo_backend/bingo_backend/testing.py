@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for catching N+1 queries in list endpoints.
+    """
+
+    def assertQueriesDoNotScale(self, request, add_rows, status_code=200):
+        """
+        Runs ``request()``, calls ``add_rows()`` to grow the result set, runs
+        ``request()`` again and fails if the second run needed more queries.
+        Both responses must have ``status_code``, so an error page cannot pass.
+        """
+        with CaptureQueriesContext(connection) as before:
+            response = request()
+        self.assertEqual(response.status_code, status_code, "First request failed")
+        add_rows()
+        with CaptureQueriesContext(connection) as after:
+            response = request()
+        self.assertEqual(response.status_code, status_code, "Request failed after adding rows")
+
+        if len(after) > len(before):
+            extra = "\n".join(query['sql'] for query in after.captured_queries[len(before):])
+            self.fail(f"Query count grew from {len(before)} to {len(after)} with more rows:\n{extra}")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+from bingo_room.patterns import card_line_masks, pack_masks
+
+
+def backfill_line_masks(apps, schema_editor):
+    BingoCard = apps.get_model('bingo_room', 'BingoCard')
+    for card in BingoCard.objects.only('id', 'numbers').iterator():
+        card.line_masks = pack_masks(card_line_masks(card.numbers))
+        card.save(update_fields=['line_masks'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bingo_room', '0004_bingoroom_is_closed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bingocard',
+            name='line_masks',
+            field=models.BinaryField(default=b'', max_length=120),
+        ),
+        migrations.RunPython(backfill_line_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bingo_room', '0005_bingocard_line_masks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bingoroom',
+            index=models.Index(fields=['created_at', 'id'], name='bingo_room__created_95372f_idx'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
+from users.audit import audit_sink
 from users.models import User, AuditLog
 import uuid
 import random
 import string
 import hashlib
 
+from .patterns import card_line_masks, pack_masks, unpack_masks
+
 
 def generate_room_code():
     """
@@ -25,6 +28,9 @@ class BingoRoom(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_closed = models.BooleanField(default=False)  # NOVO CAMPO: indica se a sala está fechada
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'])]
+
     def __str__(self):
         return self.room_code
 
@@ -43,21 +49,21 @@ class RoomParticipant(models.Model):
         Save and create audit log for room join.
         """
         super().save(*args, **kwargs)
-        AuditLog.objects.create(
+        audit_sink.record(AuditLog(
             actor=self.user,
             action=f"Joined room {self.room.room_code}",
             target=None
-        )
+        ))
 
     def delete(self, *args, **kwargs):
         """
         Delete and create audit log for room leave.
         """
-        AuditLog.objects.create(
+        audit_sink.record(AuditLog(
             actor=self.user,
             action=f"Left room {self.room.room_code}",
             target=None
-        )
+        ))
         super().delete(*args, **kwargs)
 
     def __str__(self):
@@ -73,6 +79,7 @@ class BingoCard(models.Model):
     room = models.ForeignKey(BingoRoom, on_delete=models.CASCADE, related_name='cards')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cards')
     numbers = models.JSONField()  # Store 5x5 bingo matrix
+    line_masks = models.BinaryField(max_length=120, default=b'')  # 12 packed 75-bit line masks
     created_at = models.DateTimeField(auto_now_add=True)
 
     def generate_numbers(self):
@@ -89,20 +96,61 @@ class BingoCard(models.Model):
         card[2][2] = 0  # free space in the center
         return [list(row) for row in zip(*card)]  # transpose to rows
 
-    def save(self, *args, **kwargs):
+    def prepare(self):
+        """
+        Fill in numbers, hash and line masks without touching the database.
+        """
         if not self.numbers:
             self.numbers = self.generate_numbers()
         if not self.card_hash:
             raw_data = str(self.numbers) + str(self.owner_id) + str(self.room_id)
             self.card_hash = hashlib.sha256(raw_data.encode()).hexdigest()
+        if not self.line_masks:
+            self.line_masks = pack_masks(card_line_masks(self.numbers))
+
+    def save(self, *args, **kwargs):
+        self.prepare()
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
-        if not AuditLog.objects.filter(action__icontains=self.card_hash).exists():
-            AuditLog.objects.create(
-                actor=self.owner,
-                action=f"Generated BingoCard for room {self.room.room_code} with hash {self.card_hash}",
-                target=None
-            )
+        # Only the first save generates the card; later saves must not log it again
+        if adding:
+            audit_sink.record(AuditLog(**self.generation_log_fields()))
+
+    def generation_log_fields(self):
+        return {
+            "actor": self.owner,
+            "action": f"Generated BingoCard for room {self.room.room_code} with hash {self.card_hash}",
+            "target": None,
+        }
+
+    @classmethod
+    def bulk_generate(cls, owner, room, count):
+        """
+        Generate ``count`` distinct cards in memory and insert them, and their
+        generation audit records, with one bulk_create each.
+        """
+        cards = {}
+        while len(cards) < count:
+            for _ in range(count - len(cards)):
+                card = cls(owner=owner, room=room)
+                card.prepare()
+                cards.setdefault(card.card_hash, card)
+            taken = cls.objects.filter(card_hash__in=list(cards)).values_list('card_hash', flat=True)
+            for card_hash in taken:
+                del cards[card_hash]
+
+        created = cls.objects.bulk_create(cards.values())
+        audit_sink.record_many(AuditLog(**card.generation_log_fields()) for card in created)
+        return created
+
+    def get_line_masks(self):
+        """
+        Returns the 12 winning-line masks (rows, columns, diagonals) of this card.
+        """
+        if self.line_masks:
+            return unpack_masks(self.line_masks)
+        return card_line_masks(self.numbers)
 
     def __str__(self):
         return f"Card {self.card_hash[:8]}... for {self.owner.username}"
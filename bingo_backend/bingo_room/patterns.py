@@ -0,0 +1,78 @@
+"""
+Bitmask helpers for bingo pattern detection.
+
+Numbers 1-75 map to bits 0-74, so any set of numbers fits in a single
+75-bit integer. A winning line is complete when ``line & drawn == line``.
+"""
+
+MAX_NUMBER = 75
+MASK_BYTES = 10  # 75 bits rounded up to whole bytes
+
+# Order matters: validation reports the first complete line in this order.
+LINE_PATTERNS = ['row'] * 5 + ['column'] * 5 + ['main diagonal', 'anti-diagonal']
+
+
+def number_bit(number):
+    """
+    Returns the bit for a number. The free space (0) has no bit.
+    """
+    return 1 << (number - 1) if number else 0
+
+
+def mask_of(numbers):
+    mask = 0
+    for number in numbers:
+        mask |= number_bit(number)
+    return mask
+
+
+def numbers_in(mask):
+    """
+    Yields the numbers whose bits are set in a mask, in ascending order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length()
+        mask ^= low
+
+
+def card_lines(matrix):
+    """
+    Returns the 12 lines of a 5x5 matrix (rows, columns, diagonals) in LINE_PATTERNS order.
+    """
+    rows = [list(row) for row in matrix]
+    cols = [list(col) for col in zip(*matrix)]
+    main = [matrix[i][i] for i in range(5)]
+    anti = [matrix[i][4 - i] for i in range(5)]
+    return rows + cols + [main, anti]
+
+
+def card_line_masks(matrix):
+    return [mask_of(line) for line in card_lines(matrix)]
+
+
+def find_winning_line(line_masks, drawn_mask):
+    """
+    Returns the pattern name of the first complete line, or None.
+    """
+    for pattern, line in zip(LINE_PATTERNS, line_masks):
+        if line & drawn_mask == line:
+            return pattern
+    return None
+
+
+def mask_to_bytes(mask):
+    return mask.to_bytes(MASK_BYTES, 'big')
+
+
+def mask_from_bytes(data):
+    return int.from_bytes(bytes(data or b''), 'big')
+
+
+def pack_masks(masks):
+    return b''.join(mask_to_bytes(mask) for mask in masks)
+
+
+def unpack_masks(data):
+    data = bytes(data or b'')
+    return [mask_from_bytes(data[i:i + MASK_BYTES]) for i in range(0, len(data), MASK_BYTES)]
@@ -16,6 +16,11 @@ class BingoCardSerializer(serializers.ModelSerializer):
         read_only_fields = ['card_hash', 'numbers', 'created_at', 'owner']
 
 
+class BingoCardBulkSerializer(serializers.Serializer):
+    room = serializers.PrimaryKeyRelatedField(queryset=BingoRoom.objects.all())
+    count = serializers.IntegerField(min_value=1, max_value=1000)
+
+
 class RoomParticipantSerializer(serializers.ModelSerializer):
     room = BingoRoomSerializer(read_only=True)
 
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bingo_backend.response_cache import invalidate
+from .models import BingoRoom, RoomParticipant
+
+
+@receiver([post_save, post_delete], sender=BingoRoom)
+def invalidate_room(sender, instance, **kwargs):
+    invalidate(f"room:{instance.room_code}")
+
+
+@receiver([post_save, post_delete], sender=RoomParticipant)
+def invalidate_room_participants(sender, instance, **kwargs):
+    if RoomParticipant.room.is_cached(instance):
+        invalidate(f"room:{instance.room.room_code}")
+        return
+    # Only cascade deletes get here without the room loaded
+    room_code = BingoRoom.objects.filter(pk=instance.room_id).values_list('room_code', flat=True).first()
+    if room_code is not None:
+        invalidate(f"room:{room_code}")
@@ -1,8 +1,14 @@
 from django.urls import reverse
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
-from users.models import User
+from users.audit import audit_sink
+from users.models import User, AuditLog
+from bingo_backend.testing import QueryCountAssertionsMixin
 from .models import BingoRoom, RoomParticipant, BingoCard
+from .patterns import card_line_masks, find_winning_line, mask_of, pack_masks, unpack_masks
 
 
 class BingoRoomAPITestCase(APITestCase):
@@ -75,3 +81,110 @@ class BingoRoomAPITestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.player_token)
         response = self.client.post(reverse('bingocard-list'), {"room": room["id"]})
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BingoPatternTestCase(TestCase):
+
+    def setUp(self):
+        self.matrix = [
+            [1, 16, 31, 46, 61],
+            [2, 17, 32, 47, 62],
+            [3, 18, 0, 48, 63],
+            [4, 19, 34, 49, 64],
+            [5, 20, 35, 50, 65],
+        ]
+
+    def test_free_space_has_no_bit(self):
+        self.assertEqual(mask_of([0]), 0)
+        self.assertEqual(mask_of([1, 75]), 1 | (1 << 74))
+
+    def test_detects_each_pattern(self):
+        lines = card_line_masks(self.matrix)
+        self.assertEqual(find_winning_line(lines, mask_of([3, 18, 48, 63])), "row")
+        self.assertEqual(find_winning_line(lines, mask_of([31, 32, 34, 35])), "column")
+        self.assertEqual(find_winning_line(lines, mask_of([1, 17, 49, 65])), "main diagonal")
+        self.assertEqual(find_winning_line(lines, mask_of([61, 47, 19, 5])), "anti-diagonal")
+        self.assertIsNone(find_winning_line(lines, mask_of([1, 2, 3, 4])))
+
+    def test_card_masks_are_precomputed_on_save(self):
+        owner = User.objects.create_user(username='owner', password='x', email='owner@example.com')
+        room = BingoRoom.objects.create(created_by=owner)
+        card = BingoCard.objects.create(owner=owner, room=room)
+        self.assertEqual(unpack_masks(card.line_masks), card_line_masks(card.numbers))
+        self.assertEqual(unpack_masks(pack_masks([0, 1 << 74])), [0, 1 << 74])
+
+
+class BingoCardBulkTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host2', password='host123', role='host', email='host2@example.com')
+        self.player = User.objects.create_user(username='player2', password='player123', email='player2@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        RoomParticipant.objects.create(user=self.player, room=self.room)
+        self.client.force_authenticate(self.player)
+
+    def test_bulk_creates_distinct_cards_with_audit_records(self):
+        response = self.client.post(reverse('bingocard-bulk'), {"room": self.room.id, "count": 50})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        cards = BingoCard.objects.filter(owner=self.player, room=self.room)
+        self.assertEqual(cards.values('card_hash').distinct().count(), 50)
+        generated = AuditLog.objects.filter(action__startswith=f"Generated BingoCard for room {self.room.room_code} ")
+        self.assertEqual(generated.count(), 50)
+        card = cards.first()
+        self.assertEqual(card.get_line_masks(), card_line_masks(card.numbers))
+
+    def test_thousand_cards_take_a_handful_of_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('bingocard-bulk'), {"room": self.room.id, "count": 1000})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(BingoCard.objects.filter(owner=self.player).count(), 1000)
+
+    def test_bulk_requires_room_membership(self):
+        other_room = BingoRoom.objects.create(created_by=self.host)
+        response = self.client.post(reverse('bingocard-bulk'), {"room": other_room.id, "count": 5})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(BingoCard.objects.filter(room=other_room).exists())
+
+    def test_card_generation_is_logged_once(self):
+        card = BingoCard.objects.create(owner=self.player, room=self.room)
+        card.save()
+        self.assertEqual(AuditLog.objects.filter(action__endswith=f"with hash {card.card_hash}").count(), 1)
+
+    @override_settings(AUDIT_LOG={'MODE': 'buffered', 'BATCH_SIZE': 100, 'FLUSH_INTERVAL': 60})
+    def test_card_saved_again_before_the_flush_is_logged_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            card = BingoCard.objects.create(owner=self.player, room=self.room)
+        with self.captureOnCommitCallbacks(execute=True):
+            card.save()
+        audit_sink.flush()
+        self.assertEqual(AuditLog.objects.filter(action__endswith=f"with hash {card.card_hash}").count(), 1)
+
+
+class RoomQueryCountTestCase(QueryCountAssertionsMixin, APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host3', password='host123', role='host', email='host3@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.client.force_authenticate(self.host)
+        self.joined = 0
+
+    def add_players(self, count=5):
+        for _ in range(count):
+            self.joined += 1
+            player = User.objects.create(username=f'guest{self.joined}', email=f'guest{self.joined}@example.com')
+            RoomParticipant.objects.create(user=player, room=self.room)
+
+    def test_participants_list(self):
+        self.add_players()
+        url = reverse('room-participants', args=[self.room.room_code])
+        self.assertQueriesDoNotScale(lambda: self.client.get(url), self.add_players)
+        self.assertEqual(len(self.client.get(url).data), self.joined + 1)
+
+    def test_room_list(self):
+        self.assertQueriesDoNotScale(
+            lambda: self.client.get(reverse('bingoroom-list')),
+            lambda: [BingoRoom.objects.create(created_by=self.host) for _ in range(5)],
+        )
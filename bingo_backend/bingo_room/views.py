@@ -1,12 +1,19 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
+from bingo_backend.pagination import CreatedAtPagination
+from bingo_backend.response_cache import cached_response
+from bingo_backend.serialization import FastListMixin
 from .models import BingoRoom, BingoCard, RoomParticipant
-from .serializers import BingoRoomSerializer, BingoCardSerializer
+from .serializers import BingoRoomSerializer, BingoCardSerializer, BingoCardBulkSerializer
 from .permissions import IsHostOrAdmin
+from users.audit import audit_sink
 from users.models import AuditLog
 from game_session.models import GameSession  # necessário para verificar sessões ativas
 
@@ -18,6 +25,8 @@ class BingoRoomViewSet(viewsets.ModelViewSet):
     """
     queryset = BingoRoom.objects.all()
     serializer_class = BingoRoomSerializer
+    pagination_class = CreatedAtPagination
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [IsAuthenticated()]
@@ -26,14 +35,14 @@ class BingoRoomViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         room = serializer.save(created_by=self.request.user)
         RoomParticipant.objects.create(user=self.request.user, room=room)
-        AuditLog.objects.create(
+        audit_sink.record(AuditLog(
             actor=self.request.user,
             action=f"Created Bingo Room with code {room.room_code}",
             target=None
-        )
+        ))
 
 
-class BingoCardViewSet(viewsets.ModelViewSet):
+class BingoCardViewSet(FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for generating and listing Bingo Cards.
     Only allowed if user is in the room.
@@ -45,19 +54,33 @@ class BingoCardViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return BingoCard.objects.filter(owner=self.request.user)
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        room = serializer.validated_data.get('room')
-
+    def _check_participation(self, user, room):
         try:
             participant = RoomParticipant.objects.get(user=user)
-            if participant.room != room:
-                raise ValueError("User must be in the selected room to generate a card.")
         except RoomParticipant.DoesNotExist:
-            raise ValueError("User must join the room before generating a card.")
+            raise PermissionDenied("User must join the room before generating a card.")
+        if participant.room_id != room.id:
+            raise PermissionDenied("User must be in the selected room to generate a card.")
 
+    def perform_create(self, serializer):
+        user = self.request.user
+        room = serializer.validated_data.get('room')
+        self._check_participation(user, room)
         serializer.save(owner=user)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Generates several cards for the current user in one request.
+        """
+        params = BingoCardBulkSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        room = params.validated_data['room']
+        self._check_participation(request.user, room)
+
+        cards = BingoCard.bulk_generate(request.user, room, params.validated_data['count'])
+        return Response(BingoCardSerializer(cards, many=True).data, status=status.HTTP_201_CREATED)
+
 
 class JoinRoomAPIView(APIView):
     """
@@ -65,6 +88,7 @@ class JoinRoomAPIView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def post(self, request):
         room_id = request.data.get("room")
         room = get_object_or_404(BingoRoom, id=room_id)
@@ -85,6 +109,7 @@ class LeaveRoomAPIView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def delete(self, request):
         try:
             participant = RoomParticipant.objects.get(user=request.user)
@@ -96,11 +121,11 @@ class LeaveRoomAPIView(APIView):
             session_active = GameSession.objects.filter(room=room, is_active=True).exists()
 
             if room_empty and not session_active:
-                AuditLog.objects.create(
+                audit_sink.record(AuditLog(
                     actor=request.user,
                     action=f"Room {room.room_code} deleted automatically (empty and no active session)",
                     target=None
-                )
+                ))
                 room.delete()
 
             return Response({"detail": "User left the room."}, status=status.HTTP_204_NO_CONTENT)
@@ -117,7 +142,7 @@ class MyRoomAPIView(APIView):
 
     def get(self, request):
         try:
-            participant = RoomParticipant.objects.get(user=request.user)
+            participant = RoomParticipant.objects.select_related('room').get(user=request.user)
             return Response({"room": BingoRoomSerializer(participant.room).data})
         except RoomParticipant.DoesNotExist:
             return Response({"room": None})
@@ -140,11 +165,11 @@ class DeleteRoomAPIView(APIView):
 
         room.delete()
 
-        AuditLog.objects.create(
+        audit_sink.record(AuditLog(
             actor=request.user,
             action=f"Room {room.room_code} manually deleted by creator",
             target=None
-        )
+        ))
 
         return Response({"detail": "Room deleted successfully."}, status=status.HTTP_200_OK)
 
@@ -156,13 +181,14 @@ class RoomParticipantsView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_response(lambda view, request, room_code: f"room:{room_code}")
     def get(self, request, room_code):
         try:
-            room = BingoRoom.objects.get(room_code=room_code)
+            room = BingoRoom.objects.select_related('created_by').get(room_code=room_code)
         except BingoRoom.DoesNotExist:
             return Response({"detail": "Sala não encontrada."}, status=status.HTTP_404_NOT_FOUND)
 
-        participants = RoomParticipant.objects.filter(room=room)
+        participants = RoomParticipant.objects.filter(room=room).select_related('user')
         data = []
         # Adiciona o host
         data.append({
@@ -172,7 +198,7 @@ class RoomParticipantsView(APIView):
         })
         # Adiciona os jogadores (excluindo o host se ele também estiver em RoomParticipant)
         for p in participants:
-            if p.user.id != room.created_by.id:
+            if p.user_id != room.created_by_id:
                 data.append({
                     "id": str(p.user.id),
                     "name": p.user.username,
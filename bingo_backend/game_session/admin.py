@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import GameSession, DrawnNumber, GameAuditLog, GameHistory
+from .models import GameSession, DrawnNumber, GameAuditLog, GameHistory, GameEvent
 
 @admin.register(GameSession)
 class GameSessionAdmin(admin.ModelAdmin):
@@ -27,3 +27,10 @@ class GameHistoryAdmin(admin.ModelAdmin):
     list_display = ('session', 'room_code', 'winner', 'started_at', 'ended_at', 'is_completed')
     list_filter = ('is_completed', 'ended_at')
     search_fields = ('room_code', 'winner__username')
+
+
+@admin.register(GameEvent)
+class GameEventAdmin(admin.ModelAdmin):
+    list_display = ('session', 'seq', 'kind', 'actor', 'created_at', 'projected')
+    list_filter = ('kind', 'projected')
+    search_fields = ('session__room__room_code', 'actor__username')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GameSessionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'game_session'
+
+    def ready(self):
+        from . import signals  # noqa: F401
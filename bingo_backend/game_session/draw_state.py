@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from bingo_room.patterns import mask_of
+from .events import logged_numbers
+
+
+def _cache():
+    return caches[settings.DRAW_STATE_CACHE]
+
+
+class DrawState:
+    """
+    Per-session draw state kept in the cache: the ordered list of drawn numbers.
+    The numbers still to come live in the session's draw sequence.
+
+    The state is written through on every draw and rebuilt from the event log
+    whenever it is missing or disagrees with the session's drawn mask.
+    """
+
+    def __init__(self, session_id, draws):
+        self.session_id = session_id
+        self.draws = draws
+
+    @property
+    def mask(self):
+        return mask_of(self.draws)
+
+    @staticmethod
+    def cache_key(session_id):
+        return f"draw-state:{session_id}"
+
+    @classmethod
+    def rebuild(cls, session):
+        state = cls(session.pk, logged_numbers(session))
+        state.save()
+        return state
+
+    @classmethod
+    def load(cls, session):
+        cached = _cache().get(cls.cache_key(session.pk))
+        if cached is not None:
+            state = cls(session.pk, list(cached))
+            if state.mask == session.get_drawn_mask():
+                return state
+        return cls.rebuild(session)
+
+    def record(self, number):
+        self.draws.append(number)
+        self.save()
+
+    def save(self):
+        _cache().set(self.cache_key(self.session_id), bytes(self.draws))
+
+    def discard(self):
+        _cache().delete(self.cache_key(self.session_id))
+
+
+def drawn_numbers(session):
+    """
+    The session's draws in order; ended sessions no longer keep a cached state.
+    """
+    if session.is_active:
+        return DrawState.load(session).draws
+    return logged_numbers(session)
@@ -0,0 +1,233 @@
+"""
+Event-sourced game engine.
+
+Every game action appends one GameEvent in the action's transaction; that row
+is the source of truth. DrawnNumber and GameHistory are projections of the log:
+
+- in 'sync' mode (used by the tests) events are projected right away, inside
+  the caller's transaction;
+- in 'deferred' mode they are queued once the transaction commits and
+  projected in batches, FLUSH_INTERVAL seconds later or when BATCH_SIZE
+  events are waiting.
+
+A batch that fails to project is queued again for the next flush. Events whose
+projection was lost (e.g. the process died with a non-empty queue) keep ``projected=False`` and are picked up by ``manage.py
+replay_game_events``, which can also rebuild a session's read models from
+scratch.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Max
+
+from bingo_backend.response_cache import invalidate, uuid_scope
+from bingo_room.patterns import mask_of, mask_to_bytes
+from .models import DrawnNumber, GameEvent, GameHistory
+
+logger = logging.getLogger(__name__)
+
+
+def append_event(session, kind, actor=None, projected=False, **payload):
+    """
+    Appends the next event of ``session``. Callers that change the log
+    concurrently must hold the session's row lock (see game_session.locking).
+    """
+    seq = (session.events.aggregate(Max('seq'))['seq__max'] or 0) + 1
+    event = GameEvent.objects.create(session=session, seq=seq, kind=kind, actor=actor,
+                                     payload=payload, projected=projected)
+    if not projected:
+        projector.schedule(event)
+    return event
+
+
+class SessionState:
+    """
+    A session as seen by its event log.
+    """
+
+    def __init__(self):
+        self.numbers = []
+        self.claims = 0
+        self.winner = None
+        self.card = None
+        self.card_hash = None
+        self.pattern = None
+        self.started_at = None
+        self.ended_at = None
+
+    @property
+    def is_active(self):
+        return self.ended_at is None
+
+    def apply(self, event):
+        payload = event.payload
+        if event.kind == GameEvent.SESSION_STARTED:
+            self.started_at = event.created_at
+        elif event.kind == GameEvent.NUMBER_DRAWN:
+            self.numbers.append(payload['number'])
+        elif event.kind == GameEvent.CLAIM_MADE:
+            self.claims += 1
+        elif event.kind == GameEvent.WINNER_DECLARED:
+            self.winner = payload['winner']
+            self.card = payload.get('card')
+            self.card_hash = payload.get('card_hash')
+            self.pattern = payload.get('pattern')
+        elif event.kind == GameEvent.SESSION_ENDED:
+            self.ended_at = event.created_at
+        return self
+
+
+def replay(session):
+    state = SessionState()
+    for event in session.events.order_by('seq'):
+        state.apply(event)
+    return state
+
+
+def logged_numbers(session):
+    """
+    The session's draws in order, read from the log.
+    """
+    return list(session.events.filter(kind=GameEvent.NUMBER_DRAWN).order_by('seq')
+                .values_list('payload__number', flat=True))
+
+
+def _project_history(session):
+    state = replay(session)
+    GameHistory.objects.update_or_create(session=session, defaults={
+        "room_code": session.room.room_code,
+        "winner_id": state.winner,
+        "winning_card_hash": state.card_hash,
+        "drawn_numbers": state.numbers,
+        "started_at": session.created_at,
+        "ended_at": state.ended_at,
+        "is_completed": True,
+    })
+
+
+def project(events):
+    """
+    Applies events to the read models and marks them projected. Safe to run
+    twice for the same events.
+    """
+    events = sorted(events, key=lambda event: (str(event.session_id), event.seq))
+    DrawnNumber.objects.bulk_create([
+        DrawnNumber(id=event.payload['draw'], session_id=event.session_id,
+                    number=event.payload['number'], drawn_at=event.created_at)
+        for event in events if event.kind == GameEvent.NUMBER_DRAWN
+    ], ignore_conflicts=True)
+    # bulk_create sends no post_save, so cached draw lists are invalidated here
+    for session_id in {event.session_id for event in events if event.kind == GameEvent.NUMBER_DRAWN}:
+        invalidate(uuid_scope("session", session_id))
+    for event in events:
+        if event.kind == GameEvent.SESSION_ENDED:
+            _project_history(event.session)
+    GameEvent.objects.filter(pk__in=[event.pk for event in events]).update(projected=True)
+    return len(events)
+
+
+def project_pending(batch_size=500):
+    """
+    Projects every event still marked unprojected, oldest first. Returns how many.
+    """
+    done = 0
+    while True:
+        with transaction.atomic():
+            batch = list(GameEvent.objects.filter(projected=False).select_related('session__room')
+                         .order_by('created_at')[:batch_size])
+            if not batch:
+                return done
+            done += project(batch)
+
+
+def rebuild_session(session):
+    """
+    Drops the session's read models and rebuilds them, and its drawn mask, from the log.
+    """
+    with transaction.atomic():
+        session.draws.all().delete()
+        GameHistory.objects.filter(session=session).delete()
+        events = list(session.events.select_related('session__room').order_by('seq'))
+        project(events)
+        state = SessionState()
+        for event in events:
+            state.apply(event)
+        session.drawn_mask = mask_to_bytes(mask_of(state.numbers))
+        session.save(update_fields=['drawn_mask'])
+    return state
+
+
+class Projector:
+    def __init__(self):
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def options(self):
+        return {'PROJECTION': 'sync', 'BATCH_SIZE': 200, 'FLUSH_INTERVAL': 0.5,
+                **getattr(settings, 'GAME_EVENTS', {})}
+
+    def schedule(self, event):
+        if self.options['PROJECTION'] == 'sync':
+            project([event])
+            return
+        transaction.on_commit(lambda: self._enqueue(event.pk))
+
+    def _enqueue(self, event_id):
+        options = self.options
+        with self._lock:
+            self._pending.append(event_id)
+            full = len(self._pending) >= options['BATCH_SIZE']
+            if not full and self._timer is None:
+                self._timer = threading.Timer(options['FLUSH_INTERVAL'], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """
+        Projects every queued event. Returns how many were projected.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        try:
+            with transaction.atomic():
+                events = GameEvent.objects.filter(pk__in=pending, projected=False).select_related('session__room')
+                return project(list(events))
+        except DatabaseError:
+            # Put the batch back so the next flush retries it
+            logger.exception("Projecting %d game events failed", len(pending))
+            self._requeue(pending)
+            return 0
+
+    def _requeue(self, event_ids):
+        with self._lock:
+            self._pending[:0] = event_ids
+            if self._timer is None:
+                self._timer = threading.Timer(self.options['FLUSH_INTERVAL'], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+
+projector = Projector()
+atexit.register(projector.flush)
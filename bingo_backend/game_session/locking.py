@@ -0,0 +1,74 @@
+import functools
+import logging
+import random
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import GameSession
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 10
+# SQLite already waits up to busy_timeout for the lock before it fails, so one retry is enough
+SQLITE_MAX_ATTEMPTS = 2
+# PostgreSQL serialization failure, deadlock and lock-not-available (NOWAIT) errors
+LOCK_CONFLICT_SQLSTATES = {'40001', '40P01', '55P03'}
+BACKOFF_SECONDS = 0.02
+MAX_BACKOFF_SECONDS = 0.5
+
+
+class SessionBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The game session is busy, try again."
+    default_code = 'session_busy'
+
+
+def is_lock_conflict(exc):
+    """
+    Tells lock conflicts, which a retry can get past, from every other OperationalError.
+    """
+    cause = exc.__cause__
+    sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    if sqlstate:
+        return sqlstate in LOCK_CONFLICT_SQLSTATES
+    # SQLite: "database is locked", or "database table is locked" with a shared cache
+    return 'is locked' in str(exc)
+
+
+def run_with_locked_session(pk, callback):
+    """
+    Runs ``callback(session)`` in one transaction holding a row lock on the session.
+
+    Lock conflicts (SQLite's "database is locked", deadlocks or serialization
+    failures elsewhere) roll the whole attempt back and retry it with jittered
+    backoff, up to MAX_ATTEMPTS times (SQLITE_MAX_ATTEMPTS on SQLite). Any other
+    OperationalError is raised as is.
+    """
+    attempts = SQLITE_MAX_ATTEMPTS if connection.vendor == 'sqlite' else MAX_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                session = get_object_or_404(GameSession.objects.select_for_update(), pk=pk)
+                return callback(session)
+        except OperationalError as exc:
+            if not is_lock_conflict(exc):
+                raise
+            logger.info("Lock conflict on session %s (attempt %d): %s", pk, attempt + 1, exc)
+            if attempt == attempts - 1:
+                raise SessionBusy()
+            delay = min(BACKOFF_SECONDS * (2 ** attempt), MAX_BACKOFF_SECONDS)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+def with_locked_session(view):
+    """
+    Decorator for detail actions: replaces ``pk`` with the locked GameSession.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, pk=None):
+        return run_with_locked_session(pk, lambda session: view(self, request, session))
+    return wrapper
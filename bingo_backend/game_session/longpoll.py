@@ -0,0 +1,118 @@
+import asyncio
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .draw_state import drawn_numbers
+from .models import GameSession
+from .realtime import hub
+from .websocket import authenticate_token
+
+MAX_WAIT_SECONDS = 30
+# Waiting requests also re-check the database this often, for draws made by other processes
+POLL_INTERVAL = 1.0
+
+
+@sync_to_async
+def _draw_count(pk):
+    """
+    Returns ``(number of draws, is_active)`` from the session row alone, or None.
+    """
+    session = GameSession.objects.filter(pk=pk).only('drawn_mask', 'is_active').first()
+    if session is None:
+        return None
+    return session.get_drawn_mask().bit_count(), session.is_active
+
+
+@sync_to_async
+def _draws(pk):
+    """
+    Returns ``(drawn numbers, is_active)``, or None if the session is gone.
+    """
+    session = GameSession.objects.filter(pk=pk).first()
+    if session is None:
+        return None
+    return drawn_numbers(session), session.is_active
+
+
+async def _wait_for_draw(pk, seq, timeout):
+    """
+    Waits until the session has more than ``seq`` draws, has ended or was deleted,
+    at most ``timeout`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    queue = hub.subscribe(pk)
+    try:
+        while True:
+            state = await _draw_count(pk)
+            if state is None:
+                return
+            count, is_active = state
+            remaining = deadline - time.monotonic()
+            if count > seq or not is_active or remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(queue.get(), min(remaining, POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        hub.unsubscribe(pk, queue)
+
+
+def _not_found():
+    return JsonResponse({"detail": "No GameSession matches the given query."}, status=404)
+
+
+def _etag(pk, count, is_active):
+    return f'"{pk}-{count}-{int(is_active)}"'
+
+
+@require_GET
+async def draws_since(request, pk, seq):
+    """
+    Numbers drawn after the first ``seq`` draws of a session.
+
+    ``?wait=N`` holds the request up to N seconds (max MAX_WAIT_SECONDS) until a
+    new number is drawn or the session ends. The ETag changes with every draw,
+    so ``If-None-Match`` gets a 304 while nothing happened.
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword != 'Token' or await authenticate_token(key) is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):
+        return JsonResponse({"wait": "Must be a number of seconds."}, status=400)
+    wait = min(max(wait, 0), MAX_WAIT_SECONDS)
+
+    state = await _draw_count(pk)
+    if state is None:
+        return _not_found()
+    count, is_active = state
+    if count <= seq and is_active and wait:
+        await _wait_for_draw(pk, seq, wait)
+
+    # The session may have been deleted while the request waited
+    state = await _draws(pk)
+    if state is None:
+        return _not_found()
+    numbers, is_active = state
+    etag = _etag(pk, len(numbers), is_active)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({
+            "session": str(pk),
+            "seq": len(numbers),
+            "numbers": numbers[seq:],
+            "is_active": is_active,
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
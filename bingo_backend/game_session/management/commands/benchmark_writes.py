@@ -0,0 +1,161 @@
+import logging
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from bingo_room.models import BingoRoom
+from game_session.events import projector
+from game_session.models import GameSession
+from users.audit import audit_sink
+from users.models import User
+
+# A session runs out of numbers after this many draws
+DRAWS_PER_SESSION = 75
+
+
+class LockErrorCounter(logging.Handler):
+    """
+    Counts logged "database is locked" errors: failed requests, retried session
+    locks and failed background flushes alike.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        text = record.getMessage() + (str(record.exc_info[1]) if record.exc_info else '')
+        if 'database is locked' in text:
+            self.count += 1
+
+
+class Command(BaseCommand):
+    help = ("Measures write throughput of draw-next and join-room against the configured "
+            "database, with concurrent workers. Creates its own users and rooms and deletes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Concurrent clients, one thread and connection each (default: 8).")
+        parser.add_argument('--ops', type=int, default=100,
+                            help="Requests per worker and endpoint (default: 100).")
+        parser.add_argument('--endpoint', choices=['draw-next', 'join-room'], action='append', dest='endpoints',
+                            help="Endpoint to benchmark (repeatable, default: both).")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['ops'] < 1:
+            raise CommandError("--workers and --ops must be positive.")
+
+        database = settings.DATABASES['default']
+        self.stdout.write(f"Profile {settings.DB_PROFILE} ({connection.vendor}, {database['NAME']}), "
+                          f"{options['workers']} workers x {options['ops']} requests")
+        self.prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        try:
+            for endpoint in options['endpoints'] or ['draw-next', 'join-room']:
+                setup = self.setup_draws if endpoint == 'draw-next' else self.setup_joins
+                self.report(endpoint, self.run(setup, options['workers'], options['ops']))
+        finally:
+            # Write what is still buffered before its sessions go away
+            audit_sink.flush()
+            projector.flush()
+            User.objects.filter(username__startswith=self.prefix).delete()
+
+    def user(self, name, role):
+        return User.objects.create_user(username=f"{self.prefix}-{name}", email=f"{self.prefix}-{name}@example.com",
+                                        password=None, role=role)
+
+    def room(self, host):
+        room = BingoRoom.objects.create(created_by=host)
+        return room, GameSession.objects.create(room=room)
+
+    def setup_draws(self, worker, ops):
+        """
+        Returns the requests of one worker: draws on sessions of its own.
+        """
+        host = self.user(f"draw-host{worker}", 'host')
+        urls = []
+        for _ in range(-(-ops // DRAWS_PER_SESSION)):
+            _, session = self.room(host)
+            urls += [reverse('game-session-draw-next-number', args=[session.id])] * DRAWS_PER_SESSION
+        return host, [lambda client, url=url: client.post(url) for url in urls[:ops]]
+
+    def setup_joins(self, worker, ops):
+        """
+        Returns the requests of one worker: a player joining and leaving a room. Each
+        request counted is a join; the leave that follows it is timed as part of it.
+        """
+        host = self.user(f"join-host{worker}", 'host')
+        player = self.user(f"player{worker}", 'player')
+        room, _ = self.room(host)  # the active session keeps the room alive when it empties
+
+        def join_and_leave(client):
+            response = client.post(reverse('join-room'), {'room': str(room.id)}, format='json')
+            left = client.delete(reverse('leave-room'))
+            return response if response.status_code >= 400 else left
+
+        return player, [join_and_leave] * ops
+
+    def run(self, setup, workers, ops):
+        plans = [setup(worker, ops) for worker in range(workers)]
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(workers + 1)
+        counter = LockErrorCounter()
+        retries = logging.getLogger('game_session.locking')
+        level = retries.level
+        retries.setLevel(logging.INFO)
+        logging.getLogger().addHandler(counter)
+
+        def work(user, requests):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user)
+            mine, failed = [], []
+            try:
+                start.wait()
+                for request in requests:
+                    began = time.perf_counter()
+                    response = request(client)
+                    mine.append(time.perf_counter() - began)
+                    if response.status_code >= 400:
+                        failed.append(response.status_code)
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(mine)
+                    errors.extend(failed)
+
+        threads = [threading.Thread(target=work, args=plan) for plan in plans]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - began
+            # Background writes of this run (audit entries, event projection) count too
+            audit_sink.flush()
+            projector.flush()
+        finally:
+            logging.getLogger().removeHandler(counter)
+            retries.setLevel(level)
+        return elapsed, latencies, errors, counter.count
+
+    def report(self, endpoint, result):
+        elapsed, latencies, errors, lock_errors = result
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f"{endpoint:>10}: {len(latencies)} requests in {elapsed:.2f}s = {len(latencies) / elapsed:.0f}/s, "
+            f"p50 {statistics.median(latencies) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, {len(errors)} errors, "
+            f"{lock_errors} database-locked"
+        )
+        if errors:
+            codes = ', '.join(f"{code} x{errors.count(code)}" for code in sorted(set(errors)))
+            self.stdout.write(self.style.WARNING(f"{'':>10}  failed responses: {codes}"))
@@ -0,0 +1,45 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from game_session.events import project_pending, rebuild_session
+from game_session.models import GameSession
+
+
+class Command(BaseCommand):
+    help = ("Projects game events that are still pending, or rebuilds the read models "
+            "(DrawnNumber, GameHistory, drawn mask) of sessions from their event log.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', action='append', dest='sessions', metavar='SESSION_ID',
+                            help="Rebuild this session from its log (repeatable).")
+        parser.add_argument('--all', action='store_true',
+                            help="Rebuild every session from its log.")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Pending events projected per batch (default: 500).")
+
+    def handle(self, *args, **options):
+        if options['sessions'] and options['all']:
+            raise CommandError("Use either --session or --all.")
+
+        if not options['sessions'] and not options['all']:
+            projected = project_pending(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Projected {projected} pending game events"))
+            return
+
+        sessions = GameSession.objects.select_related('room')
+        if options['sessions']:
+            try:
+                sessions = sessions.filter(pk__in=options['sessions'])
+                found = {str(session.pk) for session in sessions}
+            except ValidationError:
+                raise CommandError("Session ids must be UUIDs.")
+            missing = set(options['sessions']) - found
+            if missing:
+                raise CommandError(f"Unknown session: {', '.join(sorted(missing))}")
+
+        for session in sessions.iterator():
+            state = rebuild_session(session)
+            status = "active" if state.is_active else f"ended, winner {state.winner or 'none'}"
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {session.pk}: {len(state.numbers)} draws, {state.claims} claims, {status}"
+            ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+from bingo_room.patterns import mask_of, mask_to_bytes
+
+
+def backfill_drawn_mask(apps, schema_editor):
+    GameSession = apps.get_model('game_session', 'GameSession')
+    for session in GameSession.objects.all().iterator():
+        numbers = session.draws.values_list('number', flat=True)
+        session.drawn_mask = mask_to_bytes(mask_of(numbers))
+        session.save(update_fields=['drawn_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0002_gamesession_winner_gamesession_winning_card_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='drawn_mask',
+            field=models.BinaryField(default=b'', max_length=10),
+        ),
+        migrations.RunPython(backfill_drawn_mask, migrations.RunPython.noop),
+    ]
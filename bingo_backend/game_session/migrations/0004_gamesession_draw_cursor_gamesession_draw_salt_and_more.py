@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:56
+
+import hashlib
+import secrets
+
+from django.db import migrations, models
+
+
+def backfill_draw_sequences(apps, schema_editor):
+    """
+    Existing sessions keep their drawn numbers as the sequence prefix,
+    followed by the remaining numbers in random order.
+    """
+    GameSession = apps.get_model('game_session', 'GameSession')
+    for session in GameSession.objects.all().iterator():
+        drawn = list(session.draws.order_by('drawn_at').values_list('number', flat=True))
+        remaining = [number for number in range(1, 76) if number not in drawn]
+        secrets.SystemRandom().shuffle(remaining)
+        session.draw_sequence = bytes(drawn + remaining)
+        session.draw_cursor = len(drawn)
+        session.draw_salt = secrets.token_bytes(16)
+        session.sequence_commitment = hashlib.sha256(session.draw_salt + session.draw_sequence).hexdigest()
+        session.save(update_fields=['draw_sequence', 'draw_cursor', 'draw_salt', 'sequence_commitment'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0003_gamesession_drawn_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='draw_cursor',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='draw_salt',
+            field=models.BinaryField(default=b'', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='draw_sequence',
+            field=models.BinaryField(default=b'', max_length=75),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='sequence_commitment',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_draw_sequences, migrations.RunPython.noop),
+    ]
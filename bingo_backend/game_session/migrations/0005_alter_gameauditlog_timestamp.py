@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0004_gamesession_draw_cursor_gamesession_draw_salt_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameauditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0005_alter_gameauditlog_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gameauditlog',
+            index=models.Index(fields=['timestamp'], name='game_sessio_timesta_59a694_idx'),
+        ),
+    ]
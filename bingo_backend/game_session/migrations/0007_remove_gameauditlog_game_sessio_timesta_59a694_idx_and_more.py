@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0006_gameauditlog_game_sessio_timesta_59a694_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='gameauditlog',
+            name='game_sessio_timesta_59a694_idx',
+        ),
+        migrations.AddIndex(
+            model_name='drawnnumber',
+            index=models.Index(fields=['session', 'drawn_at', 'id'], name='game_sessio_session_40c7f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameauditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='game_sessio_timesta_9cc086_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameauditlog',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='game_sessio_session_9eda3d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamehistory',
+            index=models.Index(fields=['ended_at', 'id'], name='game_sessio_ended_a_904494_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:26
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    """
+    Logs what existing sessions already hold: their start, draws in order and,
+    for ended sessions, the winner and the end. The read models exist, so every
+    event is marked projected.
+    """
+    GameSession = apps.get_model('game_session', 'GameSession')
+    GameEvent = apps.get_model('game_session', 'GameEvent')
+    GameHistory = apps.get_model('game_session', 'GameHistory')
+    for session in GameSession.objects.select_related('winning_card').iterator():
+        events = [('session_started', session.created_at, None, {'commitment': session.sequence_commitment})]
+        for draw in session.draws.order_by('drawn_at'):
+            events.append(('number_drawn', draw.drawn_at, None, {'number': draw.number, 'draw': str(draw.id)}))
+        if not session.is_active:
+            history = GameHistory.objects.filter(session=session).first()
+            ended_at = history.ended_at if history else django.utils.timezone.now()
+            if session.winner_id:
+                card = session.winning_card
+                events.append(('winner_declared', ended_at, session.winner_id, {
+                    'winner': str(session.winner_id),
+                    'card': str(card.id) if card else None,
+                    'card_hash': card.card_hash if card else None,
+                    'pattern': None,
+                }))
+            events.append(('session_ended', ended_at, None, {'reason': 'bingo' if session.winner_id else 'manual'}))
+        GameEvent.objects.bulk_create([
+            GameEvent(session=session, seq=seq, kind=kind, created_at=created_at, actor_id=actor_id,
+                      payload=payload, projected=True)
+            for seq, (kind, created_at, actor_id, payload) in enumerate(events, start=1)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_session', '0007_remove_gameauditlog_game_sessio_timesta_59a694_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='drawnnumber',
+            name='drawn_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='gamehistory',
+            name='ended_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='GameEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('seq', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('session_started', 'Session started'), ('number_drawn', 'Number drawn'), ('claim_made', 'Claim made'), ('winner_declared', 'Winner declared'), ('session_ended', 'Session ended')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('projected', models.BooleanField(default=False)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='game_events', to=settings.AUTH_USER_MODEL)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='game_session.gamesession')),
+            ],
+            options={
+                'ordering': ['session', 'seq'],
+                'indexes': [models.Index(condition=models.Q(('projected', False)), fields=['created_at'], name='game_event_pending_idx')],
+                'unique_together': {('session', 'seq')},
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,28 @@
 from django.db import models
+from django.utils import timezone
 from bingo_room.models import BingoRoom, BingoCard
+from bingo_room.patterns import MAX_NUMBER, number_bit, mask_to_bytes, mask_from_bytes
 from users.models import User
 import uuid
+import hashlib
+import secrets
+
+
+def generate_draw_sequence():
+    """
+    Returns a cryptographically shuffled permutation of 1-75, one byte per number.
+    """
+    numbers = list(range(1, MAX_NUMBER + 1))
+    secrets.SystemRandom().shuffle(numbers)
+    return bytes(numbers)
+
+
+def commit_draw_sequence(salt, sequence):
+    """
+    Returns the SHA-256 commitment published for a draw sequence.
+    """
+    return hashlib.sha256(bytes(salt) + bytes(sequence)).hexdigest()
+
 
 class GameSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -10,6 +31,70 @@ class GameSession(models.Model):
     is_active = models.BooleanField(default=True)
     winner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='won_sessions')
     winning_card = models.ForeignKey(BingoCard, null=True, blank=True, on_delete=models.SET_NULL, related_name='winning_sessions')
+    drawn_mask = models.BinaryField(max_length=10, default=b'')  # 75-bit set of drawn numbers
+    draw_sequence = models.BinaryField(max_length=MAX_NUMBER, default=b'')  # full draw order, fixed at start
+    draw_cursor = models.PositiveSmallIntegerField(default=0)
+    draw_salt = models.BinaryField(max_length=16, default=b'')
+    sequence_commitment = models.CharField(max_length=64, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if not self.draw_sequence:
+            self.draw_sequence = generate_draw_sequence()
+            self.draw_salt = secrets.token_bytes(16)
+            self.sequence_commitment = commit_draw_sequence(self.draw_salt, self.draw_sequence)
+        super().save(*args, **kwargs)
+
+    def get_drawn_mask(self):
+        return mask_from_bytes(self.drawn_mask)
+
+    def mark_drawn(self, number):
+        """
+        Adds a number to the drawn mask and persists only that column.
+
+        The UPDATE only applies if the stored mask is still the one read; if another
+        request changed it first, the session is reloaded and the step retried.
+        """
+        while True:
+            current = bytes(self.drawn_mask)
+            mask = mask_from_bytes(current)
+            if mask & number_bit(number):
+                return
+            drawn_mask = mask_to_bytes(mask | number_bit(number))
+            if GameSession.objects.filter(pk=self.pk, drawn_mask=current).update(drawn_mask=drawn_mask):
+                self.drawn_mask = drawn_mask
+                return
+            self.refresh_from_db(fields=['drawn_mask'])
+
+    def advance_draw(self):
+        """
+        Moves the cursor to the next undrawn number of the sequence and returns it,
+        or None when every number is drawn.
+
+        The cursor and mask are updated with a single conditional UPDATE; if another
+        request moved the cursor or changed the mask first, the session is reloaded
+        and the step retried.
+        """
+        sequence = bytes(self.draw_sequence)
+        while True:
+            current = bytes(self.drawn_mask)
+            mask = mask_from_bytes(current)
+            cursor = self.draw_cursor
+            while cursor < len(sequence) and mask & number_bit(sequence[cursor]):
+                cursor += 1
+            if cursor >= len(sequence):
+                return None
+
+            number = sequence[cursor]
+            drawn_mask = mask_to_bytes(mask | number_bit(number))
+            updated = GameSession.objects.filter(pk=self.pk, draw_cursor=self.draw_cursor,
+                                                 drawn_mask=current).update(
+                draw_cursor=cursor + 1, drawn_mask=drawn_mask
+            )
+            if updated:
+                self.draw_cursor = cursor + 1
+                self.drawn_mask = drawn_mask
+                return number
+            self.refresh_from_db(fields=['draw_cursor', 'drawn_mask'])
 
     def __str__(self):
         return f"Game for Room {self.room.room_code}"
@@ -19,11 +104,26 @@ class DrawnNumber(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='draws')
     number = models.PositiveSmallIntegerField()
-    drawn_at = models.DateTimeField(auto_now_add=True)
+    drawn_at = models.DateTimeField(default=timezone.now, editable=False)  # the draw event's time when projected
 
     class Meta:
         unique_together = ('session', 'number')
         ordering = ['drawn_at']
+        indexes = [models.Index(fields=['session', 'drawn_at', 'id'])]
+
+    def save(self, *args, **kwargs):
+        """
+        Save and keep the session's drawn mask and event log in sync. The event
+        projection writes draws with bulk_create, so it does not come through here.
+        """
+        from .events import append_event
+
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            self.session.mark_drawn(self.number)
+            append_event(self.session, GameEvent.NUMBER_DRAWN, projected=True,
+                         number=self.number, draw=str(self.id))
 
     def __str__(self):
         return f"{self.number} in {self.session.room.room_code}"
@@ -34,10 +134,14 @@ class GameAuditLog(models.Model):
     session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='audit_logs')
     actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='game_actions')
     action = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)  # set at event time, not at flush
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['session', 'timestamp', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.timestamp} - {self.actor.username if self.actor else 'System'} - {self.action}"
@@ -51,11 +155,51 @@ class GameHistory(models.Model):
     winning_card_hash = models.CharField(max_length=64, null=True, blank=True)
     drawn_numbers = models.JSONField()
     started_at = models.DateTimeField()
-    ended_at = models.DateTimeField(auto_now_add=True)
+    ended_at = models.DateTimeField(default=timezone.now, editable=False)
     is_completed = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['-ended_at']
+        indexes = [models.Index(fields=['ended_at', 'id'])]
 
     def __str__(self):
         return f"History for Room {self.room_code}"
+
+
+class GameEvent(models.Model):
+    """
+    Append-only log of a session: one row per action, numbered by ``seq``.
+    DrawnNumber and GameHistory are projections of it (see game_session.events).
+    """
+    SESSION_STARTED = 'session_started'
+    NUMBER_DRAWN = 'number_drawn'
+    CLAIM_MADE = 'claim_made'
+    WINNER_DECLARED = 'winner_declared'
+    SESSION_ENDED = 'session_ended'
+    KIND_CHOICES = [
+        (SESSION_STARTED, 'Session started'),
+        (NUMBER_DRAWN, 'Number drawn'),
+        (CLAIM_MADE, 'Claim made'),
+        (WINNER_DECLARED, 'Winner declared'),
+        (SESSION_ENDED, 'Session ended'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='events')
+    seq = models.PositiveIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='game_events')
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    projected = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['session', 'seq']
+        unique_together = ('session', 'seq')
+        indexes = [
+            # Only the (few) events still waiting for their projection
+            models.Index(fields=['created_at'], condition=models.Q(projected=False), name='game_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} in {self.session_id}"
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+
+class SessionEventHub:
+    """
+    In-process fan-out of game events to WebSocket subscribers.
+
+    Subscribers are asyncio queues living on the ASGI event loop; publishers
+    are usually sync views running in worker threads, so delivery goes through
+    ``loop.call_soon_threadsafe``.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # session id -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session_id):
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[str(session_id)].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, session_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(str(session_id), set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(str(session_id), None)
+
+    def publish(self, session_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(session_id), ()))
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscriber_count(self, session_id):
+        with self._lock:
+            return len(self._subscribers.get(str(session_id), ()))
+
+
+hub = SessionEventHub()
+
+
+def publish_on_commit(session_id, event):
+    """
+    Publishes ``event`` once the current transaction commits, so clients never
+    see draws or winners that were rolled back.
+    """
+    transaction.on_commit(lambda: hub.publish(session_id, event))
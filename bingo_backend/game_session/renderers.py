@@ -0,0 +1,57 @@
+"""
+Compact binary wire format for draw state, for clients that ask for it with
+``Accept: application/vnd.bingo.draws`` (REST) or the ``bingo.draws.v1``
+WebSocket subprotocol.
+
+    state frame: 0x01 | seq (u16) | count (u8) | drawn mask (10 bytes) | draw order (count bytes)
+    draw frame:  0x02 | number (u8) | seq (u16)
+
+Integers are big-endian and the mask uses the bit layout of
+``bingo_room.patterns`` (number n is bit n - 1). On this backend ``seq`` is the
+number of draws so far.
+"""
+import struct
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from bingo_room.patterns import mask_of, mask_to_bytes
+
+MEDIA_TYPE = 'application/vnd.bingo.draws'
+SUBPROTOCOL = 'bingo.draws.v1'
+
+STATE_FRAME = 0x01
+DRAW_FRAME = 0x02
+
+
+def encode_state(numbers, seq=None):
+    numbers = list(numbers)
+    seq = len(numbers) if seq is None else seq
+    return struct.pack('>BHB', STATE_FRAME, seq, len(numbers)) + mask_to_bytes(mask_of(numbers)) + bytes(numbers)
+
+
+def encode_draw(number, seq):
+    return struct.pack('>BBH', DRAW_FRAME, number, seq)
+
+
+class DrawStateRenderer(BaseRenderer):
+    """
+    Renders draw state (``drawn_numbers``) or a single draw (``number`` and
+    ``count``) as binary frames. Anything else, errors included, falls back to JSON.
+    """
+    media_type = MEDIA_TYPE
+    format = 'draws'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if isinstance(data, dict) and (response is None or response.status_code < 400):
+            if 'drawn_numbers' in data:
+                return encode_state(data['drawn_numbers'])
+            if 'number' in data and 'count' in data:
+                return encode_draw(data['number'], data['count'])
+
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
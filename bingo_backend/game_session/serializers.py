@@ -2,9 +2,22 @@ from rest_framework import serializers
 from .models import GameSession, DrawnNumber, GameAuditLog, GameHistory
 
 class GameSessionSerializer(serializers.ModelSerializer):
+    sequence_reveal = serializers.SerializerMethodField()
+
     class Meta:
         model = GameSession
-        fields = '__all__'
+        fields = ['id', 'room', 'created_at', 'is_active', 'winner', 'winning_card',
+                  'sequence_commitment', 'sequence_reveal']
+        read_only_fields = ['is_active', 'winner', 'winning_card']
+
+    def get_sequence_reveal(self, obj):
+        # Revealed only once the session is over, so the commitment can be checked
+        if obj.is_active:
+            return None
+        return {
+            "salt": bytes(obj.draw_salt).hex(),
+            "sequence": list(bytes(obj.draw_sequence)),
+        }
 
 
 class DrawnNumberSerializer(serializers.ModelSerializer):
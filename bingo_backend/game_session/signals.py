@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bingo_backend.response_cache import invalidate, uuid_scope
+from .models import DrawnNumber, GameHistory, GameSession
+
+
+@receiver([post_save, post_delete], sender=GameSession)
+def invalidate_session(sender, instance, **kwargs):
+    invalidate(uuid_scope("session", instance.pk))
+
+
+@receiver([post_save, post_delete], sender=DrawnNumber)
+def invalidate_session_draws(sender, instance, **kwargs):
+    invalidate(uuid_scope("session", instance.session_id))
+
+
+@receiver([post_save, post_delete], sender=GameHistory)
+def invalidate_game_history(sender, instance, **kwargs):
+    invalidate(uuid_scope("game-history", instance.pk))
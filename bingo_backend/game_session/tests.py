@@ -1,9 +1,36 @@
+import asyncio
+import json
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase, override_settings
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from bingo_backend import response_cache
+from bingo_backend.pagination import DrawnAtPagination
+from bingo_backend.testing import QueryCountAssertionsMixin
+from bingo_room.patterns import mask_from_bytes, mask_of
 from users.models import User
 from bingo_room.models import BingoRoom, RoomParticipant, BingoCard
-from game_session.models import GameSession, DrawnNumber, GameHistory
+from game_session.models import GameSession, DrawnNumber, GameAuditLog, GameHistory, GameEvent, commit_draw_sequence
+from game_session.draw_state import DrawState
+from game_session.events import projector, replay
+from game_session.locking import SQLITE_MAX_ATTEMPTS, SessionBusy, is_lock_conflict, run_with_locked_session
+from game_session.realtime import hub
+from game_session.renderers import MEDIA_TYPE, SUBPROTOCOL, encode_state
+from game_session.websocket import websocket_application
+from game_session import winners
+from game_session.winners import WinnerIndex
 
 
 class GameSessionAPITestCase(APITestCase):
@@ -98,3 +125,749 @@ class GameSessionAPITestCase(APITestCase):
         response = self.client.post(reverse('game-session-validate-bingo', args=[self.session["id"]]))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("already been declared", response.data["detail"])
+
+
+class BitmaskValidationTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host2', password='host123', role='host', email='host2@example.com')
+        self.player = User.objects.create_user(username='player2', password='player123', role='player', email='player2@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        RoomParticipant.objects.create(user=self.player, room=self.room)
+        self.card = BingoCard.objects.create(owner=self.player, room=self.room)
+        self.session = GameSession.objects.create(room=self.room)
+
+    def validate(self):
+        self.client.force_authenticate(self.player)
+        return self.client.post(reverse('game-session-validate-bingo', args=[self.session.id]))
+
+    def test_drawn_numbers_update_session_mask(self):
+        DrawnNumber.objects.create(session=self.session, number=7)
+        DrawnNumber.objects.create(session=self.session, number=75)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.get_drawn_mask(), (1 << 6) | (1 << 74))
+
+    def test_column_with_free_space_wins(self):
+        for number in [row[2] for row in self.card.numbers]:
+            if number != 0:
+                DrawnNumber.objects.create(session=self.session, number=number)
+
+        response = self.validate()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("column", response.data["detail"])
+
+    def test_incomplete_line_is_rejected(self):
+        for number in self.card.numbers[0][:4]:
+            DrawnNumber.objects.create(session=self.session, number=number)
+
+        response = self.validate()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WinnerDetectionTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host3', password='host123', role='host', email='host3@example.com')
+        self.player = User.objects.create_user(username='player3', password='player123', role='player', email='player3@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        RoomParticipant.objects.create(user=self.player, room=self.room)
+        self.cards = [BingoCard.objects.create(owner=self.player, room=self.room) for _ in range(2)]
+        self.session = GameSession.objects.create(room=self.room)
+        self.client.force_authenticate(self.host)
+
+    def test_index_reports_line_when_last_number_is_marked(self):
+        card = self.cards[0]
+        index = WinnerIndex([(card.id, card.owner_id, card.get_line_masks())])
+        first_row = [n for n in card.numbers[0]]
+        for number in first_row[:-1]:
+            self.assertEqual(index.mark(number), [])
+        completed = index.mark(first_row[-1])
+        self.assertIn({"card": str(card.id), "owner": str(self.player.id), "pattern": "row"}, completed)
+
+    def test_every_line_is_reported_once_over_a_full_game(self):
+        url = reverse('game-session-draw-next-number', args=[self.session.id])
+        reported = []
+        for _ in range(75):
+            response = self.client.post(url + '?detect_winners=true')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            reported.extend(response.data["winners"])
+
+        for card in self.cards:
+            self.assertEqual(len([w for w in reported if w["card"] == str(card.id)]), 12)
+
+    def test_a_replaced_card_is_indexed(self):
+        url = reverse('game-session-draw-next-number', args=[self.session.id]) + '?detect_winners=true'
+        self.client.post(url)
+        self.cards[1].delete()
+        card = BingoCard.objects.create(owner=self.player, room=self.room)
+
+        reported = []
+        for _ in range(74):
+            reported.extend(self.client.post(url).data["winners"])
+        self.assertEqual(len([w for w in reported if w["card"] == str(card.id)]), 12)
+
+    def test_index_cache_keeps_the_most_recent_sessions(self):
+        other = GameSession.objects.create(room=BingoRoom.objects.create(created_by=self.host))
+        with mock.patch.object(winners, 'MAX_INDEXES', 1), mock.patch.dict(winners._indexes, clear=True):
+            for session in (self.session, other):
+                url = reverse('game-session-draw-next-number', args=[session.id]) + '?detect_winners=true'
+                self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(list(winners._indexes), [other.pk])
+
+    def test_detection_is_opt_in(self):
+        response = self.client.post(reverse('game-session-draw-next-number', args=[self.session.id]))
+        self.assertNotIn("winners", response.data)
+
+
+class DrawStateTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host4', password='host123', role='host', email='host4@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.session = GameSession.objects.create(room=self.room)
+        self.client.force_authenticate(self.host)
+
+    def test_draws_are_unique_and_recorded_in_order(self):
+        url = reverse('game-session-draw-next-number', args=[self.session.id])
+        numbers = [self.client.post(url).data["number"] for _ in range(75)]
+        self.assertEqual(sorted(numbers), list(range(1, 76)))
+        self.assertEqual(DrawState.load(self.session).draws, numbers)
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_state_is_rebuilt_when_cache_is_stale(self):
+        DrawState.load(self.session)
+        DrawnNumber.objects.create(session=self.session, number=10)
+
+        self.assertEqual(DrawState.load(self.session).draws, [10])
+
+    def test_history_uses_cached_draw_order(self):
+        url = reverse('game-session-draw-next-number', args=[self.session.id])
+        numbers = [self.client.post(url).data["number"] for _ in range(5)]
+        self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+        self.assertEqual(GameHistory.objects.get(session=self.session).drawn_numbers, numbers)
+
+
+class DrawSequenceTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host5', password='host123', role='host', email='host5@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.client.force_authenticate(self.host)
+        response = self.client.post(reverse('game-session-list'), {"room": self.room.id}, format='json')
+        self.session = GameSession.objects.get(id=response.data["id"])
+
+    def test_session_commits_to_a_permutation(self):
+        sequence = bytes(self.session.draw_sequence)
+        self.assertEqual(sorted(sequence), list(range(1, 76)))
+        self.assertEqual(self.session.sequence_commitment,
+                         commit_draw_sequence(self.session.draw_salt, sequence))
+
+    def test_draws_follow_the_sequence_and_skip_numbers_already_drawn(self):
+        sequence = list(bytes(self.session.draw_sequence))
+        DrawnNumber.objects.create(session=self.session, number=sequence[0])
+
+        url = reverse('game-session-draw-next-number', args=[self.session.id])
+        numbers = [self.client.post(url).data["number"] for _ in range(3)]
+        self.assertEqual(numbers, sequence[1:4])
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.draw_cursor, 4)
+
+    def test_mask_written_by_another_request_is_kept(self):
+        sequence = list(bytes(self.session.draw_sequence))
+        stale = GameSession.objects.get(pk=self.session.pk)
+        self.session.mark_drawn(sequence[5])
+
+        stale.mark_drawn(sequence[9])
+        self.assertEqual(stale.advance_draw(), sequence[0])
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.get_drawn_mask(), mask_of([sequence[0], sequence[5], sequence[9]]))
+
+    def test_sequence_is_revealed_only_after_the_session_ends(self):
+        url = reverse('game-session-detail', args=[self.session.id])
+        self.assertIsNone(self.client.get(url).data["sequence_reveal"])
+
+        self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+        reveal = self.client.get(url).data["sequence_reveal"]
+        self.assertEqual(commit_draw_sequence(bytes.fromhex(reveal["salt"]), bytes(reveal["sequence"])),
+                         self.session.sequence_commitment)
+
+
+class ConcurrencyStressTestCase(TransactionTestCase):
+    """
+    Hammers the locked endpoints from several threads against the file-backed test database.
+    """
+    THREADS = 8
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host6', password='host123', role='host', email='host6@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.players = []
+        for i in range(self.THREADS):
+            player = User.objects.create_user(username=f'racer{i}', password='x', email=f'racer{i}@example.com')
+            RoomParticipant.objects.create(user=player, room=self.room)
+            BingoCard.objects.create(owner=player, room=self.room)
+            self.players.append(player)
+        self.session = GameSession.objects.create(room=self.room)
+
+    def hammer(self, users, path, requests_per_user):
+        barrier = threading.Barrier(len(users))
+        results = []
+        lock = threading.Lock()
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for _ in range(requests_per_user):
+                    response = client.post(path)
+                    with lock:
+                        results.append((response.status_code, response.data))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_draws_never_repeat_a_number(self):
+        path = reverse('game-session-draw-next-number', args=[self.session.id])
+        results = self.hammer([self.host] * self.THREADS, path, requests_per_user=12)
+
+        codes = [code for code, _ in results]
+        self.assertEqual(codes.count(status.HTTP_201_CREATED), 75)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), len(codes) - 75)
+
+        numbers = list(DrawnNumber.objects.filter(session=self.session).values_list('number', flat=True))
+        self.assertEqual(sorted(numbers), list(range(1, 76)))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.draw_cursor, 75)
+
+    def test_concurrent_claims_produce_exactly_one_winner(self):
+        for number in range(1, 76):
+            DrawnNumber.objects.create(session=self.session, number=number)
+
+        path = reverse('game-session-validate-bingo', args=[self.session.id])
+        results = self.hammer(self.players, path, requests_per_user=1)
+
+        codes = [code for code, _ in results]
+        self.assertEqual(codes.count(status.HTTP_200_OK), 1)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), self.THREADS - 1)
+        self.assertEqual(GameHistory.objects.filter(session=self.session).count(), 1)
+        self.session.refresh_from_db()
+        self.assertIsNotNone(self.session.winner)
+
+
+class CursorPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host7', password='host123', role='host', email='host7@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.session = GameSession.objects.create(room=self.room)
+        for number in bytes(self.session.draw_sequence)[:12]:
+            DrawnNumber.objects.create(session=self.session, number=number)
+        self.client.force_authenticate(self.host)
+
+    def test_drawn_numbers_are_walked_in_draw_order(self):
+        url = reverse('drawn-number-list')
+        response = self.client.get(url, {'session': self.session.id, 'page_size': 5})
+        numbers = [draw["number"] for draw in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            numbers += [draw["number"] for draw in response.data["results"]]
+
+        self.assertEqual(numbers, list(bytes(self.session.draw_sequence)[:12]))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(DrawnAtPagination, 'max_page_size', 3):
+            response = self.client.get(reverse('drawn-number-list'), {'session': self.session.id, 'page_size': 100})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNotNone(response.data["next"])
+
+
+class GameQueryCountTestCase(QueryCountAssertionsMixin, APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host8', password='host123', role='host', email='host8@example.com')
+        self.client.force_authenticate(self.host)
+        self.games = 0
+
+    def finish_games(self, count=3):
+        for _ in range(count):
+            self.games += 1
+            winner = User.objects.create(username=f'winner{self.games}', email=f'winner{self.games}@example.com')
+            session = GameSession.objects.create(room=BingoRoom.objects.create(created_by=self.host))
+            GameAuditLog.objects.create(session=session, actor=winner, action="BINGO")
+            GameHistory.objects.create(session=session, room_code=session.room.room_code, winner=winner,
+                                       drawn_numbers=[], started_at=session.created_at)
+        return session
+
+    def test_history_list(self):
+        self.finish_games()
+        self.assertQueriesDoNotScale(lambda: self.client.get(reverse('game-history-list')), self.finish_games)
+
+    def test_game_audit_log_list(self):
+        session = self.finish_games(1)
+
+        def add_logs():
+            for i in range(5):
+                actor = User.objects.create(username=f'actor{i}', email=f'actor{i}@example.com')
+                GameAuditLog.objects.create(session=session, actor=actor, action=f"Drew number {i + 1}")
+
+        url = reverse('game-audit-log-list')
+        self.assertQueriesDoNotScale(lambda: self.client.get(url, {'session': session.id}), add_logs)
+
+
+class RealtimeFeedTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host9', password='host123', role='host', email='host9@example.com')
+        self.token = Token.objects.create(user=self.host)
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.session = GameSession.objects.create(room=self.room)
+        DrawnNumber.objects.create(session=self.session, number=7)
+        self.client.force_authenticate(self.host)
+
+    def connect(self, query_string=None, headers=(), session_id=None):
+        if query_string is None:
+            query_string = f"token={self.token.key}".encode()
+        scope = {'type': 'websocket', 'path': f'/ws/game-sessions/{session_id or self.session.id}/',
+                 'query_string': query_string, 'headers': list(headers)}
+        return ApplicationCommunicator(websocket_application, scope)
+
+    async def receive_json(self, communicator):
+        message = await communicator.receive_output(1)
+        self.assertEqual(message['type'], 'websocket.send')
+        return json.loads(message['text'])
+
+    async def test_subscriber_gets_snapshot_then_published_events(self):
+        communicator = self.connect()
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+        snapshot = await self.receive_json(communicator)
+        self.assertEqual(snapshot['numbers'], [7])
+        self.assertTrue(snapshot['is_active'])
+
+        hub.publish(self.session.id, {"type": "number_drawn", "number": 12})
+        self.assertEqual((await self.receive_json(communicator))['number'], 12)
+
+        hub.publish(self.session.id, {"type": "session_ended", "winner": None})
+        self.assertEqual((await self.receive_json(communicator))['type'], 'session_ended')
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.close')
+        await communicator.wait(1)
+        self.assertEqual(hub.subscriber_count(self.session.id), 0)
+
+    async def test_any_spelling_of_the_session_id_gets_live_events(self):
+        for session_id in (self.session.id.hex, str(self.session.id).upper()):
+            communicator = self.connect(session_id=session_id)
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+            await self.receive_json(communicator)
+
+            hub.publish(str(self.session.id), {"type": "number_drawn", "number": 12})
+            self.assertEqual((await self.receive_json(communicator))['number'], 12)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+
+    async def test_malformed_session_id_is_not_found(self):
+        communicator = self.connect(session_id='-' * 32)
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await communicator.receive_output(1), {'type': 'websocket.close', 'code': 4404})
+        await communicator.wait(1)
+        self.assertEqual(hub.subscriber_count('-' * 32), 0)
+
+    async def test_header_token_is_accepted(self):
+        communicator = self.connect(b'', [(b'authorization', f'Token {self.token.key}'.encode())])
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+        await self.receive_json(communicator)
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+        self.assertEqual(hub.subscriber_count(self.session.id), 0)
+
+    async def test_missing_or_bad_token_is_rejected(self):
+        for query_string in (b'', b'token=nope'):
+            communicator = self.connect(query_string)
+            await communicator.send_input({'type': 'websocket.connect'})
+            message = await communicator.receive_output(1)
+            self.assertEqual(message, {'type': 'websocket.close', 'code': 4401})
+
+    def test_events_are_published_after_commit(self):
+        with mock.patch.object(hub, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                number = self.client.post(reverse('game-session-draw-next-number', args=[self.session.id])).data["number"]
+                publish.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+
+        events = [call.args[1] for call in publish.call_args_list]
+        self.assertEqual([event["type"] for event in events], ["number_drawn", "session_ended"])
+        self.assertEqual(events[0]["number"], number)
+        self.assertEqual(events[0]["count"], 2)
+
+
+class WireFormatTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host10', password='host123', role='host', email='host10@example.com')
+        self.token = Token.objects.create(user=self.host)
+        self.session = GameSession.objects.create(room=BingoRoom.objects.create(created_by=self.host))
+        self.client.force_authenticate(self.host)
+        self.draw_url = reverse('game-session-draw-next-number', args=[self.session.id])
+        self.draws_url = reverse('game-session-draws', args=[self.session.id])
+
+    def test_state_frame(self):
+        numbers = [self.client.post(self.draw_url).data["number"] for _ in range(5)]
+        self.assertEqual(self.client.get(self.draws_url).data["drawn_numbers"], numbers)
+
+        response = self.client.get(self.draws_url, HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(response['Content-Type'], MEDIA_TYPE)
+        frame = response.content
+        self.assertEqual(len(frame), 4 + 10 + 5)
+        self.assertEqual(frame[:4], bytes([0x01, 0, 5, 5]))
+        self.assertEqual(mask_from_bytes(frame[4:14]), mask_of(numbers))
+        self.assertEqual(list(frame[14:]), numbers)
+
+    def test_draw_frame_and_json_errors(self):
+        frame = self.client.post(self.draw_url, HTTP_ACCEPT=MEDIA_TYPE).content
+        self.assertEqual(frame[0], 0x02)
+        self.assertEqual(frame[1], DrawnNumber.objects.get(session=self.session).number)
+        self.assertEqual(frame[2:], (1).to_bytes(2, 'big'))
+
+        self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+        response = self.client.post(self.draw_url, HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn("not active", json.loads(response.content)["detail"])
+
+    async def test_websocket_subprotocol(self):
+        scope = {'type': 'websocket', 'path': f'/ws/game-sessions/{self.session.id}/',
+                 'query_string': f"token={self.token.key}".encode(), 'headers': [],
+                 'subprotocols': [SUBPROTOCOL]}
+        communicator = ApplicationCommunicator(websocket_application, scope)
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await communicator.receive_output(1),
+                         {'type': 'websocket.accept', 'subprotocol': SUBPROTOCOL})
+        self.assertEqual((await communicator.receive_output(1))['bytes'], encode_state([]))
+
+        hub.publish(self.session.id, {"type": "number_drawn", "number": 30, "count": 1})
+        self.assertEqual((await communicator.receive_output(1))['bytes'], bytes([0x02, 30, 0, 1]))
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+
+
+class GameEventLogTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host11', password='host123', role='host', email='host11@example.com')
+        self.player = User.objects.create_user(username='player11', password='player123', role='player', email='player11@example.com')
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        RoomParticipant.objects.create(user=self.player, room=self.room)
+        self.card = BingoCard.objects.create(owner=self.player, room=self.room)
+        self.client.force_authenticate(self.host)
+        response = self.client.post(reverse('game-session-list'), {"room": self.room.id}, format='json')
+        self.session = GameSession.objects.get(id=response.data["id"])
+        self.draw_url = reverse('game-session-draw-next-number', args=[self.session.id])
+
+    def win(self):
+        for number in self.card.numbers[0]:
+            if not self.session.draws.filter(number=number).exists():
+                DrawnNumber.objects.create(session=self.session, number=number)
+        self.client.force_authenticate(self.player)
+        return self.client.post(reverse('game-session-validate-bingo', args=[self.session.id]))
+
+    def test_actions_append_events_and_project_read_models(self):
+        drawn = [self.client.post(self.draw_url).data for _ in range(3)]
+        self.assertEqual(self.win().status_code, status.HTTP_200_OK)
+
+        events = list(self.session.events.order_by('seq'))
+        self.assertEqual([event.seq for event in events], list(range(1, len(events) + 1)))
+        self.assertEqual(events[0].kind, GameEvent.SESSION_STARTED)
+        self.assertEqual([event.kind for event in events[-3:]],
+                         [GameEvent.CLAIM_MADE, GameEvent.WINNER_DECLARED, GameEvent.SESSION_ENDED])
+        self.assertTrue(all(event.projected for event in events))
+
+        self.assertEqual(str(DrawnNumber.objects.get(number=drawn[0]["number"]).id), drawn[0]["id"])
+        state = replay(self.session)
+        history = GameHistory.objects.get(session=self.session)
+        self.assertEqual(history.drawn_numbers, state.numbers)
+        self.assertEqual(history.winner, self.player)
+        self.assertEqual(history.winning_card_hash, self.card.card_hash)
+        self.assertEqual(history.ended_at, state.ended_at)
+
+    @override_settings(GAME_EVENTS={'PROJECTION': 'deferred', 'BATCH_SIZE': 1000, 'FLUSH_INTERVAL': 60})
+    def test_deferred_projection(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.post(self.draw_url).data
+        self.assertFalse(DrawnNumber.objects.filter(session=self.session).exists())
+        self.assertEqual(DrawState.load(self.session).draws, [data["number"]])
+
+        self.assertEqual(projector.flush(), 1)
+        draw = DrawnNumber.objects.get(session=self.session)
+        self.assertEqual((str(draw.id), draw.number), (data["id"], data["number"]))
+
+    @override_settings(GAME_EVENTS={'PROJECTION': 'deferred', 'BATCH_SIZE': 1000, 'FLUSH_INTERVAL': 60})
+    def test_failed_projection_is_retried(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.post(self.draw_url).data
+
+        with mock.patch('game_session.events.project', side_effect=OperationalError("database is locked")), \
+                self.assertLogs('game_session.events', 'ERROR'):
+            self.assertEqual(projector.flush(), 0)
+        self.assertEqual(projector.pending(), 1)
+        self.assertFalse(DrawnNumber.objects.filter(session=self.session).exists())
+
+        self.assertEqual(projector.flush(), 1)
+        self.assertEqual(projector.pending(), 0)
+        self.assertEqual(DrawnNumber.objects.get(session=self.session).number, data["number"])
+
+    def test_replay_command(self):
+        numbers = [self.client.post(self.draw_url).data["number"] for _ in range(4)]
+        self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+
+        # Lost projections and a corrupted mask are rebuilt from the log
+        DrawnNumber.objects.filter(session=self.session).delete()
+        GameHistory.objects.filter(session=self.session).delete()
+        GameSession.objects.filter(pk=self.session.pk).update(drawn_mask=b'')
+        call_command('replay_game_events', session=[str(self.session.id)], stdout=StringIO())
+
+        self.session.refresh_from_db()
+        self.assertEqual(list(self.session.draws.order_by('drawn_at').values_list('number', flat=True)), numbers)
+        self.assertEqual(GameHistory.objects.get(session=self.session).drawn_numbers, numbers)
+        self.assertEqual(self.session.get_drawn_mask(), mask_of(numbers))
+
+        # Without --session, only events still pending are projected
+        GameEvent.objects.filter(session=self.session, kind=GameEvent.SESSION_ENDED).update(projected=False)
+        GameHistory.objects.filter(session=self.session).delete()
+        out = StringIO()
+        call_command('replay_game_events', stdout=out)
+        self.assertIn("Projected 1 pending", out.getvalue())
+        self.assertTrue(GameHistory.objects.filter(session=self.session).exists())
+
+
+class LongPollTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host12', password='host123', role='host', email='host12@example.com')
+        self.token = Token.objects.create(user=self.host)
+        self.session = GameSession.objects.create(room=BingoRoom.objects.create(created_by=self.host))
+        for number in (4, 40):
+            DrawnNumber.objects.create(session=self.session, number=number)
+        self.auth = {'Authorization': f'Token {self.token.key}'}
+
+    def url(self, seq):
+        return reverse('game-session-draws-since', args=[self.session.id, seq])
+
+    async def test_returns_numbers_after_seq_and_honours_etag(self):
+        response = await self.async_client.get(self.url(1), headers=self.auth)
+        self.assertEqual(response.json()["numbers"], [40])
+        self.assertEqual(response.json()["seq"], 2)
+
+        etag = response['ETag']
+        response = await self.async_client.get(self.url(2), headers={**self.auth, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        await sync_to_async(DrawnNumber.objects.create)(session=self.session, number=9)
+        response = await self.async_client.get(self.url(2), headers={**self.auth, 'If-None-Match': etag})
+        self.assertEqual(response.json()["numbers"], [9])
+
+    async def test_wait_returns_as_soon_as_a_number_is_drawn(self):
+        request = asyncio.ensure_future(self.async_client.get(self.url(2), {'wait': 5}, headers=self.auth))
+        await asyncio.sleep(0.2)
+        self.assertFalse(request.done())
+
+        started = time.monotonic()
+        await sync_to_async(DrawnNumber.objects.create)(session=self.session, number=12)
+        hub.publish(self.session.id, {"type": "number_drawn", "number": 12, "count": 3})
+        response = await request
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.json()["numbers"], [12])
+
+    async def test_wait_times_out_and_requires_a_token(self):
+        response = await self.async_client.get(self.url(2), {'wait': 0.1}, headers=self.auth)
+        self.assertEqual(response.json()["numbers"], [])
+
+        response = await self.async_client.get(self.url(0))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_session_deleted_while_waiting_is_not_found(self):
+        request = asyncio.ensure_future(self.async_client.get(self.url(2), {'wait': 5}, headers=self.auth))
+        await asyncio.sleep(0.2)
+        await sync_to_async(GameSession.objects.filter(pk=self.session.pk).delete)()
+        hub.publish(self.session.id, {"type": "session_ended"})
+        response = await request
+        self.assertEqual(response.status_code, 404)
+
+    async def test_wait_must_be_a_finite_number(self):
+        for wait in ('nan', 'inf', '-inf', 'soon'):
+            response = await self.async_client.get(self.url(2), {'wait': wait}, headers=self.auth)
+            self.assertEqual(response.status_code, 400, wait)
+
+
+class ResponseCacheTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host13', password='host123', role='host', email='host13@example.com')
+        self.client.force_authenticate(self.host)
+        self.room = BingoRoom.objects.create(created_by=self.host)
+        self.session = GameSession.objects.create(room=self.room)
+
+    def test_draw_list_is_cached_until_a_number_is_drawn(self):
+        url = reverse('drawn-number-list')
+        before = response_cache.stats()
+        self.assertEqual(self.client.get(url, {'session': self.session.id})['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'session': self.session.id})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        after = response_cache.stats()
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses']), (1, 1))
+
+        drawn = self.client.post(reverse('game-session-draw-next-number', args=[self.session.id])).data['number']
+        response = self.client.get(url, {'session': self.session.id})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([draw['number'] for draw in response.data['results']], [drawn])
+
+    def test_session_detail_is_invalidated_when_the_session_ends(self):
+        url = reverse('game-session-detail', args=[self.session.id])
+        self.assertTrue(self.client.get(url).data['is_active'])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.client.post(reverse('game-session-end-session', args=[self.session.id]))
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertFalse(response.data['is_active'])
+
+    def test_any_spelling_of_the_session_id_is_invalidated(self):
+        url = reverse('drawn-number-list')
+        spelling = self.session.id.hex.upper()
+        self.assertEqual(self.client.get(url, {'session': spelling})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'session': spelling})['X-Cache'], 'HIT')
+
+        self.client.post(reverse('game-session-draw-next-number', args=[self.session.id]))
+        response = self.client.get(url, {'session': spelling})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_participants_are_invalidated_when_a_player_joins(self):
+        url = reverse('room-participants', args=[self.room.room_code])
+        self.assertEqual(len(self.client.get(url).data), 1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        player = User.objects.create(username='player12', email='player12@example.com')
+        RoomParticipant.objects.create(user=player, room=self.room)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 2)
+
+
+class FastSerializationTestCase(APITestCase):
+
+    def setUp(self):
+        self.host = User.objects.create_user(username='host14', password='host123', role='host', email='host14@example.com')
+        self.client.force_authenticate(self.host)
+        room = BingoRoom.objects.create(created_by=self.host)
+        self.session = GameSession.objects.create(room=room)
+        for number in (5, 17, 33, 48, 70):
+            DrawnNumber.objects.create(session=self.session, number=number)
+        GameAuditLog.objects.create(session=self.session, actor=self.host, action="Drew number 5")
+        GameAuditLog.objects.create(session=self.session, actor=None, action="Session ended")
+        for _ in range(3):
+            BingoCard.objects.create(owner=self.host, room=room)
+
+    def assertSameOutput(self, url, params=None):
+        """
+        Follows every page with both serializers and compares the raw bytes.
+        """
+        pages = {}
+        for fast in (False, True):
+            pages[fast] = []
+            response_cache.invalidate(f"session:{self.session.id}")
+            with override_settings(API_FAST_SERIALIZATION=fast):
+                response = self.client.get(url, params)
+                pages[fast].append(response.content)
+                while isinstance(response.data, dict) and response.data['next']:
+                    response_cache.invalidate(f"session:{self.session.id}")
+                    response = self.client.get(response.data['next'])
+                    pages[fast].append(response.content)
+        self.assertEqual(pages[True], pages[False])
+        return pages[True]
+
+    def test_drawn_numbers_match_the_serializer(self):
+        pages = self.assertSameOutput(reverse('drawn-number-list'), {'session': self.session.id, 'page_size': 2})
+        self.assertEqual(len(pages), 3)
+
+    def test_audit_logs_match_the_serializer(self):
+        pages = self.assertSameOutput(reverse('game-audit-log-list'), {'session': self.session.id})
+        logs = {log['action']: log for log in json.loads(pages[0])['results']}
+        self.assertEqual(logs["Drew number 5"]['actor_username'], 'host14')
+        self.assertNotIn('actor_username', logs["Session ended"])
+
+    def test_cards_match_the_serializer(self):
+        self.assertEqual(len(json.loads(self.assertSameOutput(reverse('bingocard-list'))[0])), 3)
+
+
+class DatabaseProfileTestCase(TransactionTestCase):
+
+    def test_sqlite_connections_use_wal(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_write_benchmark_runs_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_writes', workers=2, ops=3, stdout=out)
+        self.assertIn("draw-next: 6 requests", out.getvalue())
+        self.assertIn("join-room: 6 requests", out.getvalue())
+        self.assertNotIn("failed responses", out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+
+    def test_concurrent_writers_do_not_hit_lock_errors(self):
+        out = StringIO()
+        call_command('benchmark_writes', workers=8, ops=10, stdout=out)
+        for line in out.getvalue().splitlines()[1:]:
+            self.assertIn("0 errors, 0 database-locked", line)
+
+
+class SessionLockRetryTestCase(APITestCase):
+
+    def setUp(self):
+        host = User.objects.create_user(username='host15', password='host123', role='host', email='host15@example.com')
+        self.session = GameSession.objects.create(room=BingoRoom.objects.create(created_by=host))
+
+    @mock.patch('game_session.locking.time.sleep')
+    def test_sqlite_lock_errors_are_retried_once(self, sleep):
+        callback = mock.Mock(side_effect=OperationalError("database is locked"))
+        with self.assertLogs('game_session.locking', 'INFO'), self.assertRaises(SessionBusy):
+            run_with_locked_session(self.session.pk, callback)
+        self.assertEqual(callback.call_count, SQLITE_MAX_ATTEMPTS)
+        self.assertEqual(sleep.call_count, SQLITE_MAX_ATTEMPTS - 1)
+
+    @mock.patch('game_session.locking.time.sleep')
+    def test_other_operational_errors_are_not_retried(self, sleep):
+        callback = mock.Mock(side_effect=OperationalError("no such table: game_session_gamesession"))
+        with self.assertRaises(OperationalError):
+            run_with_locked_session(self.session.pk, callback)
+        self.assertEqual(callback.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_postgresql_conflicts_are_told_by_sqlstate(self):
+        def error(sqlstate, message):
+            cause = Exception(message)
+            cause.sqlstate = sqlstate
+            exc = OperationalError(message)
+            exc.__cause__ = cause
+            return exc
+
+        self.assertTrue(is_lock_conflict(error('40001', "could not serialize access")))
+        self.assertTrue(is_lock_conflict(error('55P03', "could not obtain lock on row")))
+        self.assertFalse(is_lock_conflict(error('57P01', "terminating connection, table is locked")))
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .longpoll import draws_since
 from .views import GameSessionViewSet, DrawnNumberViewSet, GameAuditLogViewSet, GameHistoryViewSet
 
 router = DefaultRouter()
@@ -9,5 +10,6 @@ router.register('game-audit-logs', GameAuditLogViewSet, basename='game-audit-log
 router.register('game-history', GameHistoryViewSet, basename='game-history')
 
 urlpatterns = [
+    path('game-sessions/<uuid:pk>/draws/since/<int:seq>/', draws_since, name='game-session-draws-since'),
     path('', include(router.urls)),
 ]
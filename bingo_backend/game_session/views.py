@@ -2,15 +2,30 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
-from .models import GameSession, DrawnNumber, GameAuditLog, GameHistory
+from rest_framework.settings import api_settings
+from bingo_backend.response_cache import cached_response, uuid_scope
+from bingo_backend.serialization import FastListMixin
+from bingo_backend.pagination import DrawnAtPagination, EndedAtPagination, TimestampPagination
+from bingo_room.patterns import find_winning_line
+from users.archive import parse_history_params, read_history
+from users.audit import audit_sink
+from .models import GameSession, DrawnNumber, GameAuditLog, GameHistory, GameEvent
+from .draw_state import DrawState, drawn_numbers
+from .events import append_event
+from .locking import with_locked_session
+from .realtime import publish_on_commit
+from .renderers import DrawStateRenderer
+from .winners import detect_winners, forget_session
 from .serializers import (
     GameSessionSerializer,
     DrawnNumberSerializer,
     GameAuditLogSerializer,
     GameHistorySerializer
 )
-import random
+import uuid
+
+# JSON by default; ``Accept: application/vnd.bingo.draws`` selects the binary frames
+DRAW_RENDERERS = api_settings.DEFAULT_RENDERER_CLASSES + [DrawStateRenderer]
 
 
 class GameSessionViewSet(viewsets.ModelViewSet):
@@ -18,6 +33,10 @@ class GameSessionViewSet(viewsets.ModelViewSet):
     serializer_class = GameSessionSerializer
     permission_classes = [IsAuthenticated]
 
+    @cached_response(lambda view, request, pk=None: uuid_scope("session", pk))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         session = serializer.save()
 
@@ -26,40 +45,55 @@ class GameSessionViewSet(viewsets.ModelViewSet):
         room.is_closed = True
         room.save()
 
-        GameAuditLog.objects.create(
+        append_event(session, GameEvent.SESSION_STARTED, self.request.user,
+                     commitment=session.sequence_commitment)
+        audit_sink.record(GameAuditLog(
             session=session,
             actor=self.request.user,
-            action="Game session started — room closed"
-        )
-
-    @action(detail=True, methods=['post'], url_path='draw-next')
-    def draw_next_number(self, request, pk=None):
-        session = get_object_or_404(GameSession, pk=pk)
+            action=f"Game session started — room closed (draw commitment {session.sequence_commitment})"
+        ))
+
+    @action(detail=True, methods=['get'], url_path='draws', renderer_classes=DRAW_RENDERERS)
+    def draws(self, request, pk=None):
+        session = self.get_object()
+        numbers = drawn_numbers(session)
+        return Response({"session": session.pk, "count": len(numbers), "drawn_numbers": numbers})
+
+    @action(detail=True, methods=['post'], url_path='draw-next', renderer_classes=DRAW_RENDERERS)
+    @with_locked_session
+    def draw_next_number(self, request, session):
         if not session.is_active:
             return Response({"detail": "This game session is not active."}, status=status.HTTP_400_BAD_REQUEST)
 
-        drawn_numbers = DrawnNumber.objects.filter(session=session).values_list('number', flat=True)
-        all_numbers = set(range(1, 76))
-        remaining_numbers = list(all_numbers - set(drawn_numbers))
-
-        if not remaining_numbers:
+        state = DrawState.load(session)
+        number = session.advance_draw()
+        if number is None:
             return Response({"detail": "All numbers have already been drawn."}, status=status.HTTP_400_BAD_REQUEST)
 
-        number = random.choice(remaining_numbers)
-        draw = DrawnNumber.objects.create(session=session, number=number)
+        # The log is the only write for the draw; the DrawnNumber row is its projection
+        draw = DrawnNumber(session=session, number=number)
+        event = append_event(session, GameEvent.NUMBER_DRAWN, request.user, number=number, draw=str(draw.id))
+        draw.drawn_at = event.created_at
+        state.record(number)
 
-        GameAuditLog.objects.create(
+        audit_sink.record(GameAuditLog(
             session=session,
             actor=request.user,
             action=f"Drew number {number}"
-        )
+        ))
 
-        return Response(DrawnNumberSerializer(draw).data, status=status.HTTP_201_CREATED)
+        data = DrawnNumberSerializer(draw).data
+        data['count'] = len(state.draws)
+        publish_on_commit(session.pk, {"type": "number_drawn", "number": number,
+                                       "drawn_at": data['drawn_at'], "count": data['count']})
+        if request.query_params.get('detect_winners') in ('1', 'true'):
+            data['winners'] = detect_winners(session, number)
 
-    @action(detail=True, methods=['post'], url_path='end')
-    def end_session(self, request, pk=None):
-        session = get_object_or_404(GameSession, pk=pk)
+        return Response(data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['post'], url_path='end')
+    @with_locked_session
+    def end_session(self, request, session):
         if request.user != session.room.created_by and request.user.role != 'admin':
             return Response({"detail": "Only the creator of the room or an admin can end this session."},
                             status=status.HTTP_403_FORBIDDEN)
@@ -70,55 +104,52 @@ class GameSessionViewSet(viewsets.ModelViewSet):
         session.is_active = False
         session.save()
 
-        GameAuditLog.objects.create(
+        append_event(session, GameEvent.SESSION_ENDED, request.user, reason='manual')
+        audit_sink.record(GameAuditLog(
             session=session,
             actor=request.user,
             action="Ended the game session"
-        )
+        ))
 
-        self._save_history(session)
+        self._finish(session)
+        publish_on_commit(session.pk, {"type": "session_ended", "winner": None})
 
         return Response({"detail": "Game session successfully ended."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='validate-bingo')
-    def validate_bingo(self, request, pk=None):
+    @with_locked_session
+    def validate_bingo(self, request, session):
         from bingo_room.models import BingoCard
 
-        session = get_object_or_404(GameSession, pk=pk)
-
         if not session.is_active:
             return Response({"detail": "Game session is already ended."}, status=400)
 
         if session.winner:
             return Response({"detail": "A winner has already been declared."}, status=400)
 
-        try:
-            card = BingoCard.objects.get(owner=request.user, room=session.room)
-        except BingoCard.DoesNotExist:
+        cards = BingoCard.objects.filter(owner=request.user, room=session.room)
+        if request.data.get('card'):
+            try:
+                cards = cards.filter(id=uuid.UUID(str(request.data['card'])))
+            except ValueError:
+                return Response({"detail": "Invalid card id."}, status=400)
+        cards = list(cards)
+        if not cards:
             return Response({"detail": "You do not have a card in this room."}, status=404)
 
-        numbers_drawn = set(session.draws.values_list('number', flat=True))
-        matrix = card.numbers
-
-        for row in matrix:
-            if all(num in numbers_drawn or num == 0 for num in row):
-                return self._declare_winner(session, request.user, card, "row")
+        drawn_mask = session.get_drawn_mask()
+        for card in cards:
+            pattern = find_winning_line(card.get_line_masks(), drawn_mask)
+            if pattern:
+                return self._declare_winner(session, request.user, card, pattern)
 
-        for col in zip(*matrix):
-            if all(num in numbers_drawn or num == 0 for num in col):
-                return self._declare_winner(session, request.user, card, "column")
-
-        if all(matrix[i][i] in numbers_drawn or matrix[i][i] == 0 for i in range(5)):
-            return self._declare_winner(session, request.user, card, "main diagonal")
-
-        if all(matrix[i][4 - i] in numbers_drawn or matrix[i][4 - i] == 0 for i in range(5)):
-            return self._declare_winner(session, request.user, card, "anti-diagonal")
-
-        GameAuditLog.objects.create(
+        append_event(session, GameEvent.CLAIM_MADE, request.user, valid=False,
+                     card=str(request.data['card']) if request.data.get('card') else None)
+        audit_sink.record(GameAuditLog(
             session=session,
             actor=request.user,
             action="Invalid BINGO attempt"
-        )
+        ))
 
         return Response({"detail": "BINGO is not valid."}, status=400)
 
@@ -128,32 +159,39 @@ class GameSessionViewSet(viewsets.ModelViewSet):
         session.is_active = False
         session.save()
 
-        GameAuditLog.objects.create(
+        append_event(session, GameEvent.CLAIM_MADE, user, valid=True, card=str(card.pk))
+        append_event(session, GameEvent.WINNER_DECLARED, user, winner=str(user.pk), card=str(card.pk),
+                     card_hash=card.card_hash, pattern=pattern)
+        append_event(session, GameEvent.SESSION_ENDED, user, reason='bingo')
+
+        audit_sink.record(GameAuditLog(
             session=session,
             actor=user,
             action=f"🎉 BINGO VALIDATED — WINNER by {pattern}"
-        )
+        ))
 
-        self._save_history(session)
+        self._finish(session)
+        publish_on_commit(session.pk, {"type": "winner", "winner": user.username,
+                                       "card": str(card.pk), "pattern": pattern})
+        publish_on_commit(session.pk, {"type": "session_ended", "winner": user.username})
 
         return Response({"detail": f"🎉 BINGO! You are the winner by {pattern}."}, status=200)
 
-    def _save_history(self, session):
-        GameHistory.objects.create(
-            session=session,
-            room_code=session.room.room_code,
-            winner=session.winner,
-            winning_card_hash=session.winning_card.card_hash if session.winning_card else None,
-            drawn_numbers=list(session.draws.values_list('number', flat=True)),
-            started_at=session.created_at,
-            is_completed=True
-        )
+    def _finish(self, session):
+        # GameHistory is projected from the session_ended event
+        forget_session(session)
+        DrawState(session.pk, []).discard()
 
 
-class DrawnNumberViewSet(viewsets.ReadOnlyModelViewSet):
+class DrawnNumberViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = DrawnNumber.objects.all()
     serializer_class = DrawnNumberSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DrawnAtPagination
+
+    @cached_response(lambda view, request: uuid_scope("session", request.query_params.get('session')))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         session_id = self.request.query_params.get('session')
@@ -162,10 +200,11 @@ class DrawnNumberViewSet(viewsets.ReadOnlyModelViewSet):
         return self.queryset.none()
 
 
-class GameAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = GameAuditLog.objects.all()
+class GameAuditLogViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = GameAuditLog.objects.select_related('actor')
     serializer_class = GameAuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TimestampPagination
 
     def get_queryset(self):
         session_id = self.request.query_params.get('session')
@@ -173,8 +212,23 @@ class GameAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
             return self.queryset.filter(session__id=session_id)
         return self.queryset.none()
 
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Newest-first entries of a session, reading the archive once the hot table runs out.
+        """
+        limit, before = parse_history_params(request.query_params)
+        session_id = request.query_params.get('session')
+        return Response(read_history('game_session.GameAuditLog', self.get_queryset(), limit, before,
+                                     match=lambda entry: entry['session'] == session_id))
+
 
 class GameHistoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = GameHistory.objects.all()
+    queryset = GameHistory.objects.select_related('winner')
     serializer_class = GameHistorySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EndedAtPagination
+
+    @cached_response(lambda view, request, pk=None: uuid_scope("game-history", pk))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import re
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.authtoken.models import Token
+
+from .draw_state import drawn_numbers
+from .models import GameSession
+from .realtime import hub
+from .renderers import SUBPROTOCOL, encode_draw, encode_state
+
+SESSION_PATH = re.compile(r'^/ws/game-sessions/(?P<session_id>[0-9a-fA-F-]{32,36})/$')
+
+# Close codes in the application range (4000-4999)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+
+
+def _token_key(scope):
+    """
+    Reads the DRF token from ``?token=`` (browsers cannot set WebSocket headers)
+    or from an ``Authorization: Token <key>`` header.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('token'):
+        return query['token'][0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            keyword, _, key = value.decode().partition(' ')
+            if keyword == 'Token':
+                return key
+    return None
+
+
+@sync_to_async
+def authenticate_token(key):
+    """
+    Returns the active user owning a DRF token key, or None.
+    """
+    if not key:
+        return None
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+@sync_to_async
+def _snapshot(session_id):
+    session = GameSession.objects.select_related('winner').filter(pk=session_id).first()
+    if session is None:
+        return None
+    return {
+        "type": "snapshot",
+        "session": str(session.pk),
+        "numbers": drawn_numbers(session),
+        "is_active": session.is_active,
+        "winner": session.winner.username if session.winner else None,
+    }
+
+
+async def _send_json(send, event):
+    await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+
+async def _send_event(send, event, binary):
+    # Binary clients get snapshots and draws as frames; rarer events stay JSON
+    if binary and event['type'] == 'snapshot':
+        await send({'type': 'websocket.send', 'bytes': encode_state(event['numbers'])})
+    elif binary and event['type'] == 'number_drawn':
+        await send({'type': 'websocket.send', 'bytes': encode_draw(event['number'], event['count'])})
+    else:
+        await _send_json(send, event)
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI app for ``/ws/game-sessions/<session id>/``.
+
+    After the handshake the client gets a snapshot of the session, then every
+    draw, winner and session end as they are committed. Client messages are
+    ignored; the socket closes after the session ends. Clients offering the
+    ``bingo.draws.v1`` subprotocol get snapshots and draws as binary frames.
+    """
+    match = SESSION_PATH.match(scope['path'])
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    if await authenticate_token(_token_key(scope)) is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    try:
+        # Events are published under the canonical id, whatever the URL spelling
+        session_id = str(uuid.UUID(match.group('session_id')))
+    except ValueError:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    queue = hub.subscribe(session_id)
+    try:
+        snapshot = await _snapshot(session_id)
+        if snapshot is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+            return
+
+        binary = SUBPROTOCOL in scope.get('subprotocols', [])
+        if binary:
+            await send({'type': 'websocket.accept', 'subprotocol': SUBPROTOCOL})
+        else:
+            await send({'type': 'websocket.accept'})
+        await _send_event(send, snapshot, binary)
+        if not snapshot['is_active']:
+            await send({'type': 'websocket.close', 'code': 1000})
+            return
+
+        receiver = asyncio.ensure_future(receive())
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                event = getter.result()
+                await _send_event(send, event, binary)
+                if event['type'] == 'session_ended':
+                    await send({'type': 'websocket.close', 'code': 1000})
+                    receiver.cancel()
+                    return
+            else:
+                getter.cancel()
+            if receiver in done:
+                if receiver.result()['type'] == 'websocket.disconnect':
+                    getter.cancel()
+                    return
+                receiver = asyncio.ensure_future(receive())
+    finally:
+        hub.unsubscribe(session_id, queue)
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.db.models import Count, Max
+
+from bingo_room.patterns import LINE_PATTERNS, card_line_masks, number_bit, numbers_in, unpack_masks
+
+
+class WinnerIndex:
+    """
+    Inverted index from each number to the card lines that contain it.
+
+    Every line keeps a counter of numbers still missing, so marking a number
+    only touches the cards holding it and a line is complete when its counter
+    reaches zero.
+    """
+
+    def __init__(self, cards, drawn_mask=0):
+        self.slots = defaultdict(list)  # number -> [(card_id, line_index)]
+        self.remaining = {}  # card_id -> missing count per line
+        self.owners = {}
+        self.drawn_mask = drawn_mask
+        for card_id, owner_id, line_masks in cards:
+            self.owners[card_id] = owner_id
+            counters = []
+            for line_index, line in enumerate(line_masks):
+                counters.append(bin(line & ~drawn_mask).count('1'))
+                for number in numbers_in(line):
+                    self.slots[number].append((card_id, line_index))
+            self.remaining[card_id] = counters
+
+    def mark(self, number):
+        """
+        Marks a drawn number and returns the lines it completed.
+        """
+        bit = number_bit(number)
+        if self.drawn_mask & bit:
+            return []
+        self.drawn_mask |= bit
+
+        completed = []
+        for card_id, line_index in self.slots.get(number, ()):
+            counters = self.remaining[card_id]
+            counters[line_index] -= 1
+            if counters[line_index] == 0:
+                completed.append({
+                    "card": str(card_id),
+                    "owner": str(self.owners[card_id]),
+                    "pattern": LINE_PATTERNS[line_index],
+                })
+        return completed
+
+    def advance(self, drawn_mask):
+        """
+        Marks every number in ``drawn_mask`` not seen yet, so an index that missed
+        draws made elsewhere catches up before reporting.
+        """
+        completed = []
+        for number in numbers_in(drawn_mask & ~self.drawn_mask):
+            completed.extend(self.mark(number))
+        return completed
+
+
+# Process-local (cards fingerprint, index) pairs, keyed by session id, least
+# recently used first. Sessions that end in another worker are never forgotten
+# here, so only the MAX_INDEXES most recent are kept.
+MAX_INDEXES = 64
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def detect_winners(session, number):
+    """
+    Returns every card line completed by drawing ``number`` in ``session``.
+    """
+    drawn_mask = session.get_drawn_mask()
+    previous_mask = drawn_mask & ~number_bit(number)
+    # A card swapped for a new one keeps the count but not the newest creation time
+    fingerprint = tuple(session.room.cards.aggregate(Count('id'), Max('created_at')).values())
+
+    with _indexes_lock:
+        cached, index = _indexes.get(session.pk, (None, None))
+        if index is not None:
+            _indexes.move_to_end(session.pk)
+    if cached != fingerprint or index.drawn_mask & ~drawn_mask:
+        cards = session.room.cards.values_list('id', 'owner_id', 'line_masks', 'numbers')
+        index = WinnerIndex(
+            [(card_id, owner_id, unpack_masks(masks) or card_line_masks(numbers))
+             for card_id, owner_id, masks, numbers in cards],
+            drawn_mask=previous_mask,
+        )
+        with _indexes_lock:
+            _indexes[session.pk] = (fingerprint, index)
+            _indexes.move_to_end(session.pk)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+
+    return index.advance(drawn_mask)
+
+
+def forget_session(session):
+    with _indexes_lock:
+        _indexes.pop(session.pk, None)
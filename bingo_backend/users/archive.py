@@ -0,0 +1,138 @@
+"""
+Cold storage for audit tables.
+
+Rows older than a cutoff are moved out of the hot table into gzip-compressed
+JSON Lines files, one per model and month:
+
+    <AUDIT_ARCHIVE['DIR']>/<app_label>.<model_name>/<YYYY-MM>.jsonl.gz
+
+Each line holds the row as rendered by the model's API serializer, so archived
+entries can be returned by the API unchanged.
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+MAX_HISTORY_LIMIT = 1000
+
+
+def _options():
+    return settings.AUDIT_ARCHIVE
+
+
+def archived_models():
+    return list(_options()['MODELS'])
+
+
+def _serializer_class(model_label):
+    return import_string(_options()['MODELS'][model_label])
+
+
+def _model_dir(model_label):
+    return Path(_options()['DIR']) / model_label.lower()
+
+
+def archive_older_than(model_label, cutoff, chunk_size=1000):
+    """
+    Moves every row with ``timestamp < cutoff`` into the monthly archive files,
+    ``chunk_size`` rows at a time. Returns the number of rows moved.
+    """
+    model = apps.get_model(model_label)
+    serializer_class = _serializer_class(model_label)
+    directory = _model_dir(model_label)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    queryset = model.objects.filter(timestamp__lt=cutoff).order_by('timestamp', 'pk')
+    moved = 0
+    while True:
+        # Each chunk goes to one month's file in the transaction that deletes it:
+        # a failed delete writes nothing and a failed write rolls the delete back
+        with transaction.atomic():
+            rows = list(queryset[:chunk_size])
+            if not rows:
+                return moved
+            month = rows[0].timestamp.strftime('%Y-%m')
+            rows = [row for row in rows if row.timestamp.strftime('%Y-%m') == month]
+            model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+            # Appending a new gzip member keeps earlier chunks readable as one stream
+            with gzip.open(directory / f"{month}.jsonl.gz", 'at', encoding='utf-8') as archive:
+                for row in rows:
+                    archive.write(json.dumps(serializer_class(row).data, cls=DjangoJSONEncoder) + '\n')
+                archive.flush()
+                os.fsync(archive.fileno())
+        moved += len(rows)
+
+
+def iter_archived(model_label, before=None):
+    """
+    Yields archived entries newest first, optionally only those older than ``before``.
+    """
+    directory = _model_dir(model_label)
+    if not directory.exists():
+        return
+    for path in sorted(directory.glob('*.jsonl.gz'), reverse=True):
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            entries = [json.loads(line) for line in archive if line.strip()]
+        entries.sort(key=lambda entry: entry['timestamp'], reverse=True)
+        for entry in entries:
+            if before is None or parse_datetime(entry['timestamp']) < before:
+                yield entry
+
+
+def parse_history_params(query_params):
+    """
+    Reads ``limit`` (default 100, max MAX_HISTORY_LIMIT) and an optional ISO
+    ``before``; a ``before`` without an offset is taken in the current time zone.
+    """
+    try:
+        limit = min(int(query_params.get('limit', 100)), MAX_HISTORY_LIMIT)
+    except ValueError:
+        raise ValidationError({"limit": "Must be an integer."})
+    if limit < 1:
+        raise ValidationError({"limit": "Must be positive."})
+
+    before = query_params.get('before')
+    if before:
+        try:
+            before = parse_datetime(before)
+        except ValueError:
+            # Well formed but out of range, e.g. month 13
+            before = None
+        if before is None:
+            raise ValidationError({"before": "Must be an ISO 8601 datetime."})
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+    return limit, before or None
+
+
+def read_history(model_label, queryset, limit, before=None, match=None):
+    """
+    Returns up to ``limit`` serialized entries, newest first: the hot table is
+    queried first and the archive is only opened when the hot rows run out.
+    ``match`` filters archived entries the way ``queryset`` filters hot rows.
+    """
+    if before is not None:
+        queryset = queryset.filter(timestamp__lt=before)
+    hot = list(queryset.order_by('-timestamp')[:limit])
+    results = list(_serializer_class(model_label)(hot, many=True).data)
+    if len(results) >= limit:
+        return results
+
+    oldest = hot[-1].timestamp if hot else before
+    for entry in iter_archived(model_label, before=oldest):
+        if match is None or match(entry):
+            results.append(entry)
+            if len(results) >= limit:
+                break
+    return results
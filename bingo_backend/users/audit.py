@@ -0,0 +1,101 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSink:
+    """
+    Collects audit entries (AuditLog, GameAuditLog, ...) and writes them in batches.
+
+    In 'buffered' mode entries are queued once the surrounding transaction
+    commits and flushed with one bulk_create per model when the batch is full
+    or FLUSH_INTERVAL seconds after the first queued entry. In 'sync' mode
+    (used by the tests) every entry is saved immediately, inside the caller's
+    transaction.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def options(self):
+        return {'MODE': 'sync', 'BATCH_SIZE': 200, 'FLUSH_INTERVAL': 1.0, **getattr(settings, 'AUDIT_LOG', {})}
+
+    def record(self, entry):
+        self.record_many([entry])
+
+    def record_many(self, entries):
+        entries = list(entries)
+        if not entries:
+            return
+        if self.options['MODE'] == 'sync':
+            for model, group in self._by_model(entries).items():
+                model.objects.bulk_create(group)
+            return
+        transaction.on_commit(lambda: self._enqueue(entries))
+
+    def _enqueue(self, entries):
+        options = self.options
+        with self._lock:
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= options['BATCH_SIZE']
+            if not full and self._timer is None:
+                self._timer = threading.Timer(options['FLUSH_INTERVAL'], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """
+        Writes every buffered entry. Returns how many were written.
+        """
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        written = 0
+        for model, group in self._by_model(pending).items():
+            try:
+                model.objects.bulk_create(group)
+                written += len(group)
+            except DatabaseError:
+                # One bad row (e.g. its session was deleted meanwhile) must not drop the batch
+                for entry in group:
+                    try:
+                        entry.save(force_insert=True)
+                        written += 1
+                    except DatabaseError:
+                        logger.exception("Dropping audit entry %r", entry.action)
+        return written
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    @staticmethod
+    def _by_model(entries):
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[type(entry)].append(entry)
+        return groups
+
+
+audit_sink = AuditSink()
+atexit.register(audit_sink.flush)
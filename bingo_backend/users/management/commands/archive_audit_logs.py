@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from users.archive import archive_older_than, archived_models
+
+
+class Command(BaseCommand):
+    help = "Moves audit log rows older than N days into compressed monthly JSONL archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help="Archive rows older than this many days.")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Rows moved per batch (default: 1000).")
+        parser.add_argument('--model', action='append', dest='models', metavar='APP_LABEL.MODEL',
+                            help="Only archive this model (repeatable). Defaults to every audit model.")
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError("--older-than must be zero or positive.")
+
+        models = options['models'] or archived_models()
+        unknown = set(models) - set(archived_models())
+        if unknown:
+            raise CommandError(f"Not an archivable audit model: {', '.join(sorted(unknown))}")
+
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        for model_label in models:
+            moved = archive_older_than(model_label, cutoff, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {moved} {model_label} rows older than {cutoff:%Y-%m-%d %H:%M}"
+            ))
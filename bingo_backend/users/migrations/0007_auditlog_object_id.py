@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:05
+
+import re
+
+from django.db import migrations, models
+
+CARD_HASH = re.compile(r'with hash ([0-9a-f]{64})')
+
+
+def backfill_card_hashes(apps, schema_editor):
+    AuditLog = apps.get_model('users', 'AuditLog')
+    logs = AuditLog.objects.filter(action__startswith='Generated BingoCard', object_id__isnull=True)
+    for log in logs.iterator():
+        match = CARD_HASH.search(log.action)
+        if match:
+            log.object_id = match.group(1)
+            log.save(update_fields=['object_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_remove_user_age_remove_user_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='object_id',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_card_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_remove_auditlog_users_audit_timesta_45d1d4_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='object_id',
+        ),
+    ]
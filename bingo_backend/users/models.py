@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
@@ -50,10 +51,11 @@ class AuditLog(models.Model):
     actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='performed_actions')
     target = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='targeted_actions')
     action = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)  # set at event time, not at flush
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp', 'id'])]
 
     def __str__(self):
         return f'{self.timestamp} - {self.actor.username} - {self.action}'
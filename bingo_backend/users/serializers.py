@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .audit import audit_sink
 from .models import User, AuditLog
 
 
@@ -49,11 +50,11 @@ class UserSerializer(serializers.ModelSerializer):
 
         # Registra no audit log se o criador for autenticado
         if request and request.user.is_authenticated:
-            AuditLog.objects.create(
+            audit_sink.record(AuditLog(
                 actor=request.user,
                 target=user,
                 action=f"Created user '{user.username}' with role '{user.role}'"
-            )
+            ))
 
         return user
 
@@ -1,7 +1,23 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import User
+from bingo_backend.testing import QueryCountAssertionsMixin
+from .archive import archive_older_than, iter_archived
+from .audit import AuditSink
+from .models import User, AuditLog
 
 
 class UserAPITestCase(APITestCase):
@@ -66,3 +82,136 @@ class UserAPITestCase(APITestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('token', response.data)
+
+
+BUFFERED_AUDIT = {'MODE': 'buffered', 'BATCH_SIZE': 3, 'FLUSH_INTERVAL': 60}
+
+
+class AuditSinkTestCase(TestCase):
+
+    def setUp(self):
+        self.actor = User.objects.create_user(username='auditor', password='x', email='auditor@example.com')
+        self.sink = AuditSink()
+
+    def tearDown(self):
+        self.sink.flush()
+
+    @override_settings(AUDIT_LOG=BUFFERED_AUDIT)
+    def test_buffered_entries_are_written_in_one_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sink.record(AuditLog(actor=self.actor, action="first"))
+            self.sink.record(AuditLog(actor=self.actor, action="second"))
+        self.assertEqual(self.sink.pending(), 2)
+        self.assertFalse(AuditLog.objects.exists())
+
+        with self.assertNumQueries(1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.sink.record(AuditLog(actor=self.actor, action="third"))
+        self.assertEqual(self.sink.pending(), 0)
+        self.assertEqual(AuditLog.objects.count(), 3)
+
+    @override_settings(AUDIT_LOG=BUFFERED_AUDIT)
+    def test_entries_from_rolled_back_transactions_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.sink.record(AuditLog(actor=self.actor, action="never happened"))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.sink.pending(), 0)
+
+    @override_settings(AUDIT_LOG=BUFFERED_AUDIT)
+    def test_event_time_is_kept_when_flushed_later(self):
+        entry = AuditLog(actor=self.actor, action="late")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sink.record(entry)
+        self.sink.flush()
+        self.assertEqual(AuditLog.objects.get(action="late").timestamp, entry.timestamp)
+
+    def test_sync_mode_writes_immediately(self):
+        self.sink.record(AuditLog(actor=self.actor, action="now"))
+        self.assertTrue(AuditLog.objects.filter(action="now").exists())
+
+
+class AuditArchiveTestCase(APITestCase):
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        archive_settings = override_settings(AUDIT_ARCHIVE={**settings.AUDIT_ARCHIVE, 'DIR': self.archive_dir})
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.admin = User.objects.create_user(username='admin9', password='x', role='admin', email='admin9@example.com')
+        now = timezone.now()
+        for days in (90, 60, 40):
+            AuditLog.objects.create(actor=self.admin, action=f"{days} days ago", timestamp=now - timedelta(days=days))
+        AuditLog.objects.create(actor=self.admin, action="today", timestamp=now)
+
+    def test_command_moves_old_rows_into_monthly_archives(self):
+        out = StringIO()
+        call_command('archive_audit_logs', '--older-than', '30', '--chunk-size', '2', '--model', 'users.AuditLog', stdout=out)
+
+        self.assertIn("Archived 3 users.AuditLog rows", out.getvalue())
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), ["today"])
+        self.assertGreaterEqual(len(list(Path(self.archive_dir, 'users.auditlog').glob('*.jsonl.gz'))), 2)
+        self.assertEqual([entry['action'] for entry in iter_archived('users.AuditLog')],
+                         ["40 days ago", "60 days ago", "90 days ago"])
+
+    def test_failed_delete_does_not_archive_the_chunk(self):
+        cutoff = timezone.now() - timedelta(days=30)
+        with mock.patch.object(QuerySet, 'delete', side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                archive_older_than('users.AuditLog', cutoff)
+        self.assertEqual(list(iter_archived('users.AuditLog')), [])
+
+        self.assertEqual(archive_older_than('users.AuditLog', cutoff), 3)
+        self.assertEqual([entry['action'] for entry in iter_archived('users.AuditLog')],
+                         ["40 days ago", "60 days ago", "90 days ago"])
+
+    def test_history_reads_hot_rows_before_the_archive(self):
+        call_command('archive_audit_logs', '--older-than', '30', stdout=StringIO())
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('auditlog-history'), {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['action'] for entry in response.data], ["today", "40 days ago", "60 days ago"])
+        self.assertEqual(response.data[1]['actor_username'], 'admin9')
+
+    def test_history_before_without_offset_reaches_the_archive(self):
+        call_command('archive_audit_logs', '--older-than', '30', stdout=StringIO())
+        before = (timezone.now() - timedelta(days=50)).replace(tzinfo=None).isoformat()
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('auditlog-history'), {'before': before})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['action'] for entry in response.data], ["60 days ago", "90 days ago"])
+
+    def test_history_rejects_invalid_before(self):
+        self.client.force_authenticate(self.admin)
+        for before in ('2024-13-01T00:00', 'yesterday'):
+            response = self.client.get(reverse('auditlog-history'), {'before': before})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, before)
+
+
+class UserQueryCountTestCase(QueryCountAssertionsMixin, APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin8', password='x', role='admin', email='admin8@example.com')
+        self.client.force_authenticate(self.admin)
+        self.created = 0
+
+    def add_users(self, count=5):
+        for _ in range(count):
+            self.created += 1
+            user = User.objects.create(username=f'member{self.created}', email=f'member{self.created}@example.com')
+            AuditLog.objects.create(actor=self.admin, target=user, action="Created user")
+
+    def test_user_list(self):
+        self.add_users()
+        self.assertQueriesDoNotScale(lambda: self.client.get(reverse('user-list')), self.add_users)
+
+    def test_audit_log_list(self):
+        self.add_users()
+        self.assertQueriesDoNotScale(lambda: self.client.get(reverse('auditlog-list')), self.add_users)
@@ -5,13 +5,16 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 
+from bingo_backend.pagination import TimestampPagination
+from .archive import parse_history_params, read_history
+from .audit import audit_sink
 from .models import User, AuditLog
 from .serializers import UserSerializer, AuditLogSerializer
 from .permissions import IsAdmin
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.prefetch_related('groups', 'user_permissions')
     serializer_class = UserSerializer
 
     def get_permissions(self):
@@ -65,19 +68,28 @@ class UserViewSet(viewsets.ModelViewSet):
         user.role = new_role
         user.save()
 
-        AuditLog.objects.create(
+        audit_sink.record(AuditLog(
             actor=request.user,
             target=user,
             action=f"Changed role from {old_role} to {new_role}"
-        )
+        ))
 
         return Response({'detail': f'Role updated to {new_role} successfully.'})
 
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('actor', 'target')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = TimestampPagination
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Newest-first entries, reading the archive once the hot table runs out.
+        """
+        limit, before = parse_history_params(request.query_params)
+        return Response(read_history('users.AuditLog', self.get_queryset(), limit, before))
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -0,0 +1,159 @@
+"""
+Room message fan-out across workers.
+
+Each worker keeps its own WebSocket connections. ``ConnectionManager.broadcast``
+publishes a room message once through a fan-out backend, and every worker that
+has sockets in that room gets it back and delivers it locally.
+
+Backends:
+
+- ``InMemoryFanout``: a single process; publishing delivers directly.
+- ``BrokerFanout``: a pub/sub broker with one channel per room. ``broker`` can
+  be a ``redis.asyncio.Redis`` client or ``LocalBroker``, an in-process stand-in
+  with the same API that lets several managers in one process act as separate
+  workers.
+
+``fanout_from_env`` picks the backend from ``BINGO_FANOUT_URL``: empty or
+``memory://`` for in-memory, ``redis://...`` for Redis.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+
+CHANNEL_PREFIX = "bingo:room:"
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryFanout:
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def join(self, room_code):
+        pass
+
+    async def leave(self, room_code):
+        pass
+
+    async def publish(self, room_code, message):
+        if self._deliver is not None:
+            await self._deliver(room_code, message)
+
+
+class BrokerFanout:
+    """
+    A worker subscribes to a room's channel while it has local sockets in that room.
+    """
+
+    def __init__(self, broker, prefix=CHANNEL_PREFIX):
+        self.broker = broker
+        self.prefix = prefix
+        self._pubsub = None
+        self._listener = None
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self._pubsub = self.broker.pubsub()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def join(self, room_code):
+        await self._pubsub.subscribe(self.prefix + room_code)
+
+    async def leave(self, room_code):
+        await self._pubsub.unsubscribe(self.prefix + room_code)
+
+    async def publish(self, room_code, message):
+        await self.broker.publish(self.prefix + room_code, json.dumps(message))
+
+    async def _listen(self):
+        while True:
+            item = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if item is None:
+                continue
+            channel = item["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                await self._deliver(channel[len(self.prefix):], json.loads(item["data"]))
+            except Exception:
+                # A failed delivery must not stop the listener for every other room
+                logger.exception("Fan-out delivery failed on %s", channel)
+
+
+class LocalBroker:
+    """
+    In-process stand-in for a Redis pub/sub server (``publish`` + ``pubsub()``).
+    """
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+
+    def pubsub(self):
+        return LocalPubSub(self)
+
+    async def publish(self, channel, data):
+        subscribers = list(self._channels.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub._queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(subscribers)
+
+
+class LocalPubSub:
+    def __init__(self, broker):
+        self._broker = broker
+        self._channels = set()
+        self._queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self._channels.add(channel)
+            self._broker._channels[channel].add(self)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or list(self._channels):
+            self._channels.discard(channel)
+            self._broker._channels[channel].discard(self)
+            if not self._broker._channels[channel]:
+                del self._broker._channels[channel]
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        await self.unsubscribe()
+
+
+def fanout_from_env():
+    url = os.environ.get("BINGO_FANOUT_URL", "")
+    if not url or url.startswith("memory://"):
+        return InMemoryFanout()
+    if url.startswith(("redis://", "rediss://")):
+        import redis.asyncio as redis  # optional: only needed for multi-worker deployments
+
+        return BrokerFanout(redis.from_url(url))
+    raise ValueError(f"Unsupported BINGO_FANOUT_URL: {url}")
@@ -0,0 +1,243 @@
+"""
+Storage for the games served by ``main.py``.
+
+A store maps room codes to game dicts. Changes go through ``update``, which
+reads the game, applies a change and saves it as one atomic step, so two
+workers changing the same room cannot overwrite each other. ``get`` is for
+reads only. Implementations:
+
+- ``MemoryGameStore``: a dict, lost on restart.
+- ``SqliteGameStore``: one SQLite file in WAL mode, one JSON row per room.
+  Nothing is cached and ``update`` runs in a ``BEGIN IMMEDIATE`` transaction,
+  so several workers can share the same file.
+- ``ShardedGameStore``: spreads rooms over several stores with a consistent
+  hash ring, so adding a shard only moves about 1/N of the rooms.
+
+``game_store_from_env`` reads ``BINGO_GAME_STORE`` (``memory://`` or
+``sqlite:///<directory>``) and ``BINGO_GAME_SHARDS``.
+"""
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class GameStore:
+    def get(self, room_code):
+        raise NotImplementedError
+
+    def save(self, room_code, game):
+        raise NotImplementedError
+
+    def add(self, room_code, game):
+        """
+        Saves a new game. Returns False, saving nothing, if the room already exists.
+        """
+        raise NotImplementedError
+
+    def update(self, room_code, change):
+        """
+        Calls ``change(game)``, which may mutate the game, and saves the result
+        without letting another writer in between. ``change`` gets None for an
+        unknown room, and then nothing is saved. Returns what ``change`` returns.
+        """
+        raise NotImplementedError
+
+    def delete(self, room_code):
+        raise NotImplementedError
+
+    def rooms(self):
+        raise NotImplementedError
+
+    def __contains__(self, room_code):
+        return self.get(room_code) is not None
+
+    def close(self):
+        pass
+
+
+class MemoryGameStore(GameStore):
+    def __init__(self):
+        self._games = {}
+        self._lock = threading.Lock()
+
+    def get(self, room_code):
+        return self._games.get(room_code)
+
+    def save(self, room_code, game):
+        self._games[room_code] = game
+
+    def add(self, room_code, game):
+        with self._lock:
+            return self._games.setdefault(room_code, game) is game
+
+    def update(self, room_code, change):
+        with self._lock:
+            return change(self._games.get(room_code))
+
+    def delete(self, room_code):
+        self._games.pop(room_code, None)
+
+    def rooms(self):
+        return list(self._games)
+
+
+def dump_game(game):
+    return json.dumps(game, separators=(",", ":"))
+
+
+def _mask(numbers):
+    mask = 0
+    for number in numbers:
+        mask |= 1 << (number - 1)
+    return mask
+
+
+def load_game(data):
+    game = json.loads(data)
+    # Games saved before the O(1) draw loop have no pool of remaining numbers and keep
+    # each player's marks as a list ("marked_numbers") instead of card bitmaps
+    if "remaining" not in game:
+        drawn = set(game["drawn_numbers"])
+        game["remaining"] = [number for number in range(1, 76) if number not in drawn]
+    for player in game.get("players", {}).values():
+        if "card_mask" not in player:
+            card_mask = _mask(player["cartela"])
+            marked_mask = _mask(player.pop("marked_numbers", ())) & card_mask
+            player.update(card_mask=card_mask, marked_mask=marked_mask,
+                          missing=card_mask.bit_count() - marked_mask.bit_count())
+    return game
+
+
+class SqliteGameStore(GameStore):
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA busy_timeout=5000")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS games (room_code TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def get(self, room_code):
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM games WHERE room_code = ?", (room_code,)).fetchone()
+        return load_game(row[0]) if row else None
+
+    def save(self, room_code, game):
+        with self._lock:
+            self._save(room_code, game)
+
+    def _save(self, room_code, game):
+        self._connection.execute(
+            "INSERT INTO games (room_code, data) VALUES (?, ?) "
+            "ON CONFLICT(room_code) DO UPDATE SET data = excluded.data",
+            (room_code, dump_game(game)),
+        )
+
+    def add(self, room_code, game):
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO games (room_code, data) VALUES (?, ?) ON CONFLICT(room_code) DO NOTHING",
+                (room_code, dump_game(game)),
+            )
+        return cursor.rowcount == 1
+
+    def update(self, room_code, change):
+        with self._lock:
+            # Takes the write lock before reading, so other workers wait (busy_timeout) instead of interleaving
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute("SELECT data FROM games WHERE room_code = ?", (room_code,)).fetchone()
+                game = load_game(row[0]) if row else None
+                result = change(game)
+                if game is not None:
+                    self._save(room_code, game)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return result
+
+    def delete(self, room_code):
+        with self._lock:
+            self._connection.execute("DELETE FROM games WHERE room_code = ?", (room_code,))
+
+    def rooms(self):
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT room_code FROM games")]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class HashRing:
+    """
+    Consistent hashing of keys to node names, with virtual nodes for balance.
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self._ring = sorted(
+            (self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def node_for(self, key):
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[index][1]
+
+
+class ShardedGameStore(GameStore):
+    def __init__(self, shards):
+        self.shards = dict(shards)
+        self.ring = HashRing(self.shards)
+
+    def shard_for(self, room_code):
+        return self.shards[self.ring.node_for(room_code)]
+
+    def get(self, room_code):
+        return self.shard_for(room_code).get(room_code)
+
+    def save(self, room_code, game):
+        self.shard_for(room_code).save(room_code, game)
+
+    def add(self, room_code, game):
+        return self.shard_for(room_code).add(room_code, game)
+
+    def update(self, room_code, change):
+        return self.shard_for(room_code).update(room_code, change)
+
+    def delete(self, room_code):
+        self.shard_for(room_code).delete(room_code)
+
+    def rooms(self):
+        return [room for shard in self.shards.values() for room in shard.rooms()]
+
+    def close(self):
+        for shard in self.shards.values():
+            shard.close()
+
+
+def game_store_from_env():
+    url = os.environ.get("BINGO_GAME_STORE", "memory://")
+    shard_count = int(os.environ.get("BINGO_GAME_SHARDS", 1))
+    if url.startswith("memory://"):
+        factory = lambda name: MemoryGameStore()  # noqa: E731
+    elif url.startswith("sqlite:///"):
+        directory = Path(url[len("sqlite:///"):])
+        directory.mkdir(parents=True, exist_ok=True)
+        factory = lambda name: SqliteGameStore(directory / f"{name}.sqlite3")  # noqa: E731
+    else:
+        raise ValueError(f"Unsupported BINGO_GAME_STORE: {url}")
+
+    if shard_count == 1:
+        return factory("games")
+    return ShardedGameStore({f"games-{i}": factory(f"games-{i}") for i in range(shard_count)})
@@ -1,37 +1,390 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+import os
+import struct
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import random
 import uuid
 
-app = FastAPI()
+from fanout import fanout_from_env
+from game_store import game_store_from_env
+
+# Armazena os jogos ativos (em memória ou em SQLite, ver game_store.py).
+# Alterações passam por bingo_games.update(), que lê, altera e salva de forma
+# atômica. As chamadas ao store bloqueiam, então os handlers as rodam em
+# run_in_threadpool para não travar o event loop
+bingo_games = game_store_from_env()
+
+# Últimos eventos de cada sala com clientes neste worker, para reenviar a
+# clientes que reconectam. É alimentado pelo fan-out, então inclui os eventos
+# gerados em outros workers. Quando o último socket da sala sai, o buffer fica
+# mais RESYNC_BUFFER_TTL segundos para quem reconecta logo em seguida
+RESYNC_BUFFER_SIZE = int(os.environ.get("BINGO_RESYNC_BUFFER", 128))
+RESYNC_BUFFER_TTL = float(os.environ.get("BINGO_RESYNC_TTL", 300))
+room_events = {}
+idle_rooms = {}  # sala -> quando o último socket deste worker saiu
+
+# Tempo máximo de um envio para um cliente
+SEND_TIMEOUT = 2.0
+
+# Fila de saída por conexão e o que fazer quando ela enche:
+# "drop_oldest" descarta a mensagem mais antiga, "coalesce" troca a fila por um
+# snapshot do estado da sala e "disconnect" derruba o cliente lento
+SEND_QUEUE_SIZE = int(os.environ.get("BINGO_WS_QUEUE_SIZE", 64))
+OVERFLOW_POLICY = os.environ.get("BINGO_WS_OVERFLOW", "coalesce")
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+# Formato binário compacto (mesmo layout do backend Django):
+#   estado:  0x01 | seq (u16) | quantidade (u8) | bitmap de 10 bytes | ordem (1 byte por número)
+#   sorteio: 0x02 | número (u8) | seq (u16)
+# O bit do número n é o bit n - 1 do bitmap (big-endian). Pedido com
+# "Accept: application/vnd.bingo.draws" no REST ou subprotocolo "bingo.draws.v1" no WebSocket.
+BINARY_MEDIA_TYPE = "application/vnd.bingo.draws"
+BINARY_SUBPROTOCOL = "bingo.draws.v1"
+
+
+def encode_state_frame(drawn_numbers, seq):
+    mask = 0
+    for number in drawn_numbers:
+        mask |= 1 << (number - 1)
+    return (struct.pack(">BHB", 0x01, seq, len(drawn_numbers)) + mask.to_bytes(10, "big")
+            + bytes(drawn_numbers))
+
+
+def encode_frame(message: dict):
+    # Só snapshots e números sorteados têm frame binário; o resto segue em JSON
+    if message.get("type") == "snapshot":
+        return encode_state_frame(message["drawn_numbers"], message["seq"])
+    if message.get("type") == "new_number":
+        return struct.pack(">BBH", 0x02, message["number"], message["seq"])
+    return None
+
+
+def wants_binary(request: Request):
+    return BINARY_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def new_game(host: str):
+    return {
+        "host": host,
+        "players": {},
+        "drawn_numbers": [],
+        "remaining": list(range(1, 76)),  # números ainda não sorteados, em qualquer ordem
+        "winner": None,
+        "seq": 0
+    }
+
+
+def new_player(cartela):
+    # A cartela vira um bitmap (número n = bit n - 1) e um contador do que falta marcar
+    card_mask = 0
+    for number in cartela:
+        card_mask |= 1 << (number - 1)
+    return {"cartela": cartela, "card_mask": card_mask, "marked_mask": 0, "missing": len(cartela)}
+
+
+def draw_from_pool(game):
+    """
+    Sorteia em O(1): troca uma posição aleatória com a última e remove a última.
+    """
+    pool = game["remaining"]
+    index = random.randrange(len(pool))
+    pool[index], pool[-1] = pool[-1], pool[index]
+    number = pool.pop()
+    game["drawn_numbers"].append(number)
+    return number
+
+
+def mark_on_card(player, number: int):
+    """
+    Marca o número em O(1). Retorna False se ele não está na cartela.
+    """
+    bit = 1 << (number - 1)
+    if not player["card_mask"] & bit:
+        return False
+    if not player["marked_mask"] & bit:
+        player["marked_mask"] |= bit
+        player["missing"] -= 1
+    return True
+
+
+def game_snapshot(game):
+    return {"type": "snapshot", "seq": game["seq"], "drawn_numbers": game["drawn_numbers"],
+            "winner": game["winner"]}
+
+
+def room_snapshot(room_code: str):
+    game = bingo_games.get(room_code)
+    return game_snapshot(game) if game else None
+
+
+def record_event(room_code: str, game: dict, message: dict):
+    """
+    Numera o evento com a sequência da sala. Chamado dentro de
+    bingo_games.update(); o broadcast do evento retornado vem depois.
+    """
+    game["seq"] += 1
+    return {**message, "seq": game["seq"]}
+
+
+def remember_event(room_code: str, message: dict):
+    """
+    Guarda no buffer um evento entregue pelo fan-out. O buffer some quando o
+    jogo termina.
+    """
+    if message.get("type") == "winner":
+        room_events.pop(room_code, None)
+        return
+    if message.get("seq") is None:
+        return
+    events = room_events.setdefault(room_code, deque(maxlen=RESYNC_BUFFER_SIZE))
+    if not events or message["seq"] > events[-1]["seq"]:
+        events.append(message)
+
+
+def expire_room_events(now=None):
+    """
+    Descarta os buffers de salas sem sockets neste worker há RESYNC_BUFFER_TTL.
+    """
+    now = time.monotonic() if now is None else now
+    for room_code, since in list(idle_rooms.items()):
+        if now - since >= RESYNC_BUFFER_TTL:
+            del idle_rooms[room_code]
+            room_events.pop(room_code, None)
+
+
+def resync_messages(room_code: str, last_seq: int, game):
+    """
+    O que um cliente que viu até ``last_seq`` precisa receber: os eventos
+    seguintes, se o buffer tem todos até ``game["seq"]`` sem buracos, ou um
+    snapshot completo.
+    """
+    if not game or last_seq == game["seq"]:
+        return []
+    missed = [event for event in room_events.get(room_code, ()) if event["seq"] > last_seq]
+    if [event["seq"] for event in missed] == list(range(last_seq + 1, game["seq"] + 1)):
+        return missed
+    return [game_snapshot(game)]
+
+
+class ClientConnection:
+    """
+    Um socket com fila de saída limitada e uma tarefa que escreve nele, para que
+    um cliente lento só atrase a si mesmo.
+    """
+
+    def __init__(self, websocket: WebSocket, room_code: str, manager, binary: bool = False):
+        self.websocket = websocket
+        self.room_code = room_code
+        self.manager = manager
+        self.binary = binary
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+        self.last_seq = 0
+        self.held = None  # eventos ao vivo segurados durante um resync
+        self.writer = None
+
+    def start(self):
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def stop(self):
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+    @property
+    def full(self):
+        return len(self.queue) >= self.manager.queue_size
+
+    def offer(self, payload, seq: int = None, resend: bool = False, snapshot: dict = None):
+        # ``snapshot`` é o estado da sala para a política "coalesce"; quem chama
+        # o busca fora do event loop, aqui o store não é lido
+        if self.overflowed:
+            return
+        if self.held is not None and not resend:
+            self.held.append((payload, seq, snapshot))
+            return
+        if seq is not None:
+            # Após um resync o mesmo evento pode chegar de novo pelo fan-out;
+            # só reenvios pedidos pelo cliente passam
+            if seq <= self.last_seq and not resend:
+                return
+            self.last_seq = max(self.last_seq, seq)
+        stats = self.manager.stats
+        if not self.full:
+            self.queue.append(payload)
+        elif self.manager.overflow_policy == "drop_oldest":
+            self.queue.popleft()
+            self.queue.append(payload)
+            stats["dropped"] += 1
+        elif self.manager.overflow_policy == "coalesce":
+            # O snapshot já inclui o efeito da mensagem nova e das que estavam na fila
+            stats["coalesced"] += len(self.queue) + 1
+            self.queue.clear()
+            self.queue.append(self.manager.encode(snapshot, self.binary) if snapshot is not None else payload)
+        else:
+            stats["disconnected"] += 1
+            self.queue.clear()
+            self.overflowed = True
+        self.ready.set()
+
+    def hold(self):
+        """
+        Segura os eventos ao vivo até ``release()``, para que os reenvios de um
+        resync entrem na fila antes deles e o cliente receba tudo em ordem.
+        """
+        if self.held is None:
+            self.held = []
+
+    def release(self):
+        held, self.held = self.held or [], None
+        for payload, seq, snapshot in held:
+            self.offer(payload, seq, snapshot=snapshot)
+
+    async def _write_loop(self):
+        while True:
+            await self.ready.wait()
+            if self.overflowed:
+                # 1013: tente novamente mais tarde
+                await self.manager.evict(self.websocket, self.room_code, code=1013)
+                return
+            if not self.queue:
+                self.ready.clear()
+                continue
+            payload = self.queue.popleft()
+            send = self.websocket.send_bytes if isinstance(payload, bytes) else self.websocket.send_text
+            try:
+                await asyncio.wait_for(send(payload), SEND_TIMEOUT)
+            except Exception:
+                await self.manager.evict(self.websocket, self.room_code)
+                return
 
-# Armazena os jogos ativos
-bingo_games = {}
 
 # Estrutura para armazenar conexões WebSocket
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = {}
+    """
+    Conexões locais deste worker. Broadcasts passam pelo fan-out, que entrega
+    a mensagem a todos os workers com sockets na sala.
+    """
+
+    def __init__(self, fanout=None, queue_size=SEND_QUEUE_SIZE, overflow_policy=OVERFLOW_POLICY,
+                 snapshot=room_snapshot):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.active_connections = {}  # sala -> {websocket: ClientConnection}
+        self.fanout = fanout or fanout_from_env()
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.snapshot = snapshot
+        self.stats = {"dropped": 0, "coalesced": 0, "disconnected": 0}
+
+    async def start(self):
+        await self.fanout.start(self.deliver)
 
-    async def connect(self, websocket: WebSocket, room_code: str):
-        await websocket.accept()
+    async def stop(self):
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections.values()):
+                connection.stop()
+        await self.fanout.stop()
+
+    async def connect(self, websocket: WebSocket, room_code: str, hold: bool = False):
+        binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
         if room_code not in self.active_connections:
-            self.active_connections[room_code] = []
-        self.active_connections[room_code].append(websocket)
+            self.active_connections[room_code] = {}
+            idle_rooms.pop(room_code, None)
+            expire_room_events()
+            await self.fanout.join(room_code)
+        connection = ClientConnection(websocket, room_code, self, binary)
+        if hold:
+            connection.hold()
+        self.active_connections[room_code][websocket] = connection
+        connection.start()
 
-    def disconnect(self, websocket: WebSocket, room_code: str):
-        if room_code in self.active_connections:
-            self.active_connections[room_code].remove(websocket)
-            if not self.active_connections[room_code]:
-                del self.active_connections[room_code]
+    async def disconnect(self, websocket: WebSocket, room_code: str):
+        # Pode já ter sido removido por evict()
+        connection = self.active_connections.get(room_code, {}).pop(websocket, None)
+        if connection is None:
+            return
+        connection.stop()
+        if not self.active_connections[room_code]:
+            del self.active_connections[room_code]
+            # Sem inscrição no fan-out o buffer deixa de receber eventos; um
+            # buffer com buracos cai no snapshot em resync_messages
+            idle_rooms[room_code] = time.monotonic()
+            expire_room_events()
+            await self.fanout.leave(room_code)
 
     async def broadcast(self, message: dict, room_code: str):
-        if room_code in self.active_connections:
-            for connection in self.active_connections[room_code]:
-                await connection.send_json(message)
+        await self.fanout.publish(room_code, message)
+
+    async def deliver(self, room_code: str, message: dict):
+        # Chamado pelo fan-out: cada formato é gerado uma vez e só enfileirado
+        # aqui; cada conexão envia no seu próprio ritmo
+        connections = list(self.active_connections.get(room_code, {}).values())
+        if not connections:
+            return
+        remember_event(room_code, message)
+        snapshot = None
+        if self.overflow_policy == "coalesce" and any(connection.full for connection in connections):
+            # Lido uma vez por entrega e fora do event loop, que já está sob pressão
+            snapshot = await run_in_threadpool(self.snapshot, room_code)
+        payloads = {}
+        for connection in connections:
+            if connection.binary not in payloads:
+                payloads[connection.binary] = self.encode(message, connection.binary)
+            connection.offer(payloads[connection.binary], message.get("seq"), snapshot=snapshot)
+
+    def send_to(self, websocket: WebSocket, room_code: str, messages):
+        """
+        Reenvia ``messages`` e libera os eventos ao vivo segurados desde ``hold()``.
+        """
+        connection = self.active_connections.get(room_code, {}).get(websocket)
+        if connection is None:
+            return
+        for message in messages:
+            connection.offer(self.encode(message, connection.binary), message.get("seq"), resend=True)
+        connection.release()
+
+    def hold(self, websocket: WebSocket, room_code: str):
+        connection = self.active_connections.get(room_code, {}).get(websocket)
+        if connection is not None:
+            connection.hold()
+
+    @staticmethod
+    def encode(message: dict, binary: bool = False):
+        frame = encode_frame(message) if binary else None
+        if frame is not None:
+            return frame
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    async def evict(self, websocket: WebSocket, room_code: str, code: int = 1011):
+        await self.disconnect(websocket, room_code)
+        try:
+            await asyncio.wait_for(websocket.close(code=code), SEND_TIMEOUT)
+        except Exception:
+            pass
 
 manager = ConnectionManager()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await manager.start()
+    yield
+    await manager.stop()
+    bingo_games.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
 class CreateGameRequest(BaseModel):
     user_name: str
 
@@ -46,81 +399,132 @@ class MarkNumberRequest(BaseModel):
 
 @app.post("/create_game")
 async def create_game(request: CreateGameRequest):
+    game = new_game(request.user_name)
     room_code = str(random.randint(10000, 99999))
-    bingo_games[room_code] = {
-        "host": request.user_name,
-        "players": {},
-        "drawn_numbers": [],
-        "winner": None
-    }
+    while not await run_in_threadpool(bingo_games.add, room_code, game):
+        room_code = str(random.randint(10000, 99999))
     return {"room_code": room_code}
 
 @app.post("/join_game")
 async def join_game(request: JoinGameRequest):
-    if request.room_code not in bingo_games:
-        return {"error": "Sala não encontrada"}
-
     user_cartela = random.sample(range(1, 76), 25)  # Simulação de cartela
-    bingo_games[request.room_code]["players"][request.user_name] = {
-        "cartela": user_cartela,
-        "marked_numbers": set()
-    }
+
+    def join(game):
+        if not game:
+            return False
+        game["players"][request.user_name] = new_player(user_cartela)
+        return True
+
+    if not await run_in_threadpool(bingo_games.update, request.room_code, join):
+        return {"error": "Sala não encontrada"}
     return {"message": "Entrou na sala", "cartela": user_cartela}
 
+def parse_last_seq(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+async def resync(websocket: WebSocket, room_code: str, last_seq: int):
+    # Eventos ao vivo que chegarem durante a leitura esperam pelos reenvios
+    manager.hold(websocket, room_code)
+    messages = []
+    try:
+        game = await run_in_threadpool(bingo_games.get, room_code)
+        messages = resync_messages(room_code, last_seq, game)
+    finally:
+        # Libera os eventos segurados mesmo se a leitura falhar
+        manager.send_to(websocket, room_code, messages)
+
+# Reconexão: o cliente informa o último seq visto em ?last_seq=N ou enviando
+# {"type": "resync", "last_seq": N}, e recebe só os eventos perdidos (ou um snapshot)
 @app.websocket("/ws/{room_code}")
 async def websocket_endpoint(websocket: WebSocket, room_code: str):
-    await manager.connect(websocket, room_code)
+    last_seq = parse_last_seq(websocket.query_params.get("last_seq"))
+    await manager.connect(websocket, room_code, hold=last_seq is not None)
+    if last_seq is not None:
+        await resync(websocket, room_code, last_seq)
     try:
         while True:
             data = await websocket.receive_text()
+            try:
+                request = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(request, dict) and request.get("type") == "resync":
+                last_seq = parse_last_seq(request.get("last_seq"))
+                if last_seq is not None:
+                    await resync(websocket, room_code, last_seq)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, room_code)
+        await manager.disconnect(websocket, room_code)
 
 @app.post("/draw_number/{room_code}")
-async def draw_number(room_code: str):
-    if room_code not in bingo_games:
-        return {"error": "Sala não encontrada"}
-
-    game = bingo_games[room_code]
-    if len(game["drawn_numbers"]) >= 75:
-        return {"error": "Todos os números já foram sorteados"}
+async def draw_number(room_code: str, request: Request):
+    def draw(game):
+        if not game:
+            return {"error": "Sala não encontrada"}
+        if not game["remaining"]:
+            return {"error": "Todos os números já foram sorteados"}
+        new_number = draw_from_pool(game)
+        event = record_event(room_code, game, {"type": "new_number", "number": new_number})
+        return {"event": event, "drawn_numbers": list(game["drawn_numbers"]), "seq": game["seq"]}
 
-    new_number = random.choice([i for i in range(1, 76) if i not in game["drawn_numbers"]])
-    game["drawn_numbers"].append(new_number)
+    result = await run_in_threadpool(bingo_games.update, room_code, draw)
+    if "error" in result:
+        return result
 
-    await manager.broadcast({"type": "new_number", "number": new_number}, room_code)
+    await manager.broadcast(result["event"], room_code)
 
-    return {"new_number": new_number, "drawn_numbers": game["drawn_numbers"]}
+    if wants_binary(request):
+        return Response(encode_state_frame(result["drawn_numbers"], result["seq"]), media_type=BINARY_MEDIA_TYPE)
+    return {"new_number": result["event"]["number"], "drawn_numbers": result["drawn_numbers"]}
 
 @app.post("/mark_number")
 async def mark_number(request: MarkNumberRequest):
-    game = bingo_games.get(request.room_code)
-    if not game:
-        return {"error": "Sala não encontrada"}
+    def mark(game):
+        if not game:
+            return {"error": "Sala não encontrada"}
 
-    player = game["players"].get(request.user_name)
-    if not player:
-        return {"error": "Usuário não encontrado na sala"}
+        player = game["players"].get(request.user_name)
+        if not player:
+            return {"error": "Usuário não encontrado na sala"}
 
-    if request.number not in player["cartela"]:
-        return {"error": "Número não está na cartela"}
+        if not 1 <= request.number <= 75 or not mark_on_card(player, request.number):
+            return {"error": "Número não está na cartela"}
 
-    player["marked_numbers"].add(request.number)
+        # Verifica se o jogador ganhou
+        if player["missing"] == 0:
+            game["winner"] = request.user_name
+            return {"event": record_event(request.room_code, game, {"type": "winner", "winner": request.user_name})}
+        return {}
 
-    # Verifica se o jogador ganhou
-    if player["marked_numbers"] == set(player["cartela"]):
-        game["winner"] = request.user_name
-        await manager.broadcast({"type": "winner", "winner": request.user_name}, request.room_code)
+    result = await run_in_threadpool(bingo_games.update, request.room_code, mark)
+    if "error" in result:
+        return result
+    if "event" in result:
+        await manager.broadcast(result["event"], request.room_code)
 
     return {"message": "Número marcado"}
 
+@app.get("/connection_stats")
+async def connection_stats():
+    return {
+        "rooms": len(manager.active_connections),
+        "connections": sum(len(c) for c in manager.active_connections.values()),
+        **manager.stats,
+    }
+
 @app.get("/game_status/{room_code}")
-async def game_status(room_code: str):
-    game = bingo_games.get(room_code)
+async def game_status(room_code: str, request: Request):
+    game = await run_in_threadpool(bingo_games.get, room_code)
     if not game:
         return {"error": "Sala não encontrada"}
 
+    if wants_binary(request):
+        return Response(encode_state_frame(game["drawn_numbers"], game["seq"]), media_type=BINARY_MEDIA_TYPE)
+
     return {
         "drawn_numbers": game["drawn_numbers"],
-        "winner": game["winner"]
+        "winner": game["winner"],
+        "seq": game["seq"]
     }
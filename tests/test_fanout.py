@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from fanout import BrokerFanout, InMemoryFanout, LocalBroker
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+        self.received = asyncio.Event()
+
+    async def __call__(self, room_code, message):
+        self.messages.append((room_code, message))
+        self.received.set()
+
+    async def wait(self, count):
+        while len(self.messages) < count:
+            self.received.clear()
+            await asyncio.wait_for(self.received.wait(), 2)
+
+
+class InMemoryFanoutTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_publish_delivers_locally(self):
+        fanout, deliver = InMemoryFanout(), Recorder()
+        await fanout.start(deliver)
+        await fanout.publish("12345", {"type": "new_number", "number": 7})
+        self.assertEqual(deliver.messages, [("12345", {"type": "new_number", "number": 7})])
+
+        await fanout.stop()
+        await fanout.publish("12345", {"type": "new_number", "number": 8})
+        self.assertEqual(len(deliver.messages), 1)
+
+
+class BrokerFanoutTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Two fan-outs on one LocalBroker act as two workers.
+    """
+
+    async def asyncSetUp(self):
+        broker = LocalBroker()
+        self.workers = [BrokerFanout(broker), BrokerFanout(broker)]
+        self.delivered = [Recorder(), Recorder()]
+        for fanout, deliver in zip(self.workers, self.delivered):
+            await fanout.start(deliver)
+
+    async def asyncTearDown(self):
+        for fanout in self.workers:
+            await fanout.stop()
+
+    async def test_every_worker_in_the_room_receives_a_message(self):
+        for fanout in self.workers:
+            await fanout.join("12345")
+        await self.workers[0].publish("12345", {"type": "new_number", "number": 7, "seq": 1})
+        for deliver in self.delivered:
+            await deliver.wait(1)
+            self.assertEqual(deliver.messages, [("12345", {"type": "new_number", "number": 7, "seq": 1})])
+
+    async def test_only_joined_rooms_are_delivered(self):
+        await self.workers[0].join("11111")
+        await self.workers[1].join("22222")
+        await self.workers[1].publish("11111", {"type": "winner", "winner": "ana"})
+        await self.delivered[0].wait(1)
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.delivered[1].messages, [])
+
+        await self.workers[0].leave("11111")
+        await self.workers[1].publish("11111", {"type": "winner", "winner": "bia"})
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(self.delivered[0].messages), 1)
+
+    async def test_a_failing_delivery_does_not_stop_the_listener(self):
+        calls = []
+
+        async def flaky(room_code, message):
+            calls.append(message)
+            if len(calls) == 1:
+                raise RuntimeError("socket gone")
+
+        await self.workers[0].stop()
+        await self.workers[0].start(flaky)
+        await self.workers[0].join("12345")
+        with self.assertLogs("fanout", "ERROR"):
+            await self.workers[1].publish("12345", {"n": 1})
+            await asyncio.sleep(0.05)
+        await self.workers[1].publish("12345", {"n": 2})
+        await asyncio.sleep(0.05)
+        self.assertEqual(calls, [{"n": 1}, {"n": 2}])
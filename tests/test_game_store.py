@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from game_store import (HashRing, MemoryGameStore, ShardedGameStore, SqliteGameStore,
+                        game_store_from_env)
+from main import draw_from_pool, mark_on_card, new_game, new_player
+
+
+class GameStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def stores(self):
+        sqlite = SqliteGameStore(self.directory / "games.sqlite3")
+        self.addCleanup(sqlite.close)
+        sharded = ShardedGameStore({"a": MemoryGameStore(), "b": MemoryGameStore()})
+        return [MemoryGameStore(), sqlite, sharded]
+
+    def test_save_get_delete(self):
+        for store in self.stores():
+            with self.subTest(store=type(store).__name__):
+                game = new_game("ana")
+                game["players"]["bia"] = new_player([1, 2, 3])
+                store.save("12345", game)
+                self.assertIn("12345", store)
+                self.assertEqual(store.get("12345"), game)
+                self.assertEqual(store.rooms(), ["12345"])
+                store.delete("12345")
+                self.assertIsNone(store.get("12345"))
+
+    def test_update_of_an_unknown_room_saves_nothing(self):
+        for store in self.stores():
+            with self.subTest(store=type(store).__name__):
+                self.assertEqual(store.update("12345", lambda game: game), None)
+                self.assertIsNone(store.get("12345"))
+                self.assertTrue(store.add("12345", new_game("ana")))
+                self.assertFalse(store.add("12345", new_game("bia")))
+                self.assertEqual(store.get("12345")["host"], "ana")
+
+    def test_concurrent_draws_from_two_workers_are_not_lost(self):
+        path = self.directory / "games.sqlite3"
+        workers = [SqliteGameStore(path), SqliteGameStore(path)]
+        for store in workers:
+            self.addCleanup(store.close)
+        workers[0].save("12345", new_game("ana"))
+
+        def draw(store):
+            for _ in range(15):
+                store.update("12345", draw_from_pool)
+
+        threads = [threading.Thread(target=draw, args=(workers[i % 2],)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        game = workers[1].get("12345")
+        self.assertEqual(len(game["drawn_numbers"]), 60)
+        self.assertEqual(len(set(game["drawn_numbers"])), 60)
+        self.assertEqual(len(game["remaining"]), 15)
+
+    def test_games_saved_before_the_draw_pool_are_upgraded(self):
+        store = SqliteGameStore(self.directory / "games.sqlite3")
+        self.addCleanup(store.close)
+        old = {"host": "ana", "drawn_numbers": [5, 9], "winner": None, "seq": 2,
+               "players": {"bia": {"cartela": [5, 9, 12], "marked_numbers": [5]}}}
+        store._connection.execute("INSERT INTO games (room_code, data) VALUES (?, ?)", ("12345", json.dumps(old)))
+
+        game = store.get("12345")
+        self.assertEqual(sorted(game["remaining"]), [n for n in range(1, 76) if n not in (5, 9)])
+        self.assertEqual(game["players"]["bia"]["missing"], 2)
+        self.assertNotIn(draw_from_pool(game), (5, 9))
+        player = game["players"]["bia"]
+        mark_on_card(player, 9)
+        mark_on_card(player, 12)
+        self.assertEqual(player["missing"], 0)
+
+    def test_sqlite_games_survive_a_restart(self):
+        path = self.directory / "games.sqlite3"
+        store = SqliteGameStore(path)
+        store.save("12345", new_game("ana"))
+        store.close()
+
+        store = SqliteGameStore(path)
+        self.addCleanup(store.close)
+        self.assertEqual(store.get("12345")["host"], "ana")
+
+    def test_from_env(self):
+        with mock.patch.dict(os.environ, {"BINGO_GAME_STORE": "memory://", "BINGO_GAME_SHARDS": "1"}):
+            self.assertIsInstance(game_store_from_env(), MemoryGameStore)
+        env = {"BINGO_GAME_STORE": f"sqlite:///{self.directory}", "BINGO_GAME_SHARDS": "3"}
+        with mock.patch.dict(os.environ, env):
+            store = game_store_from_env()
+            self.addCleanup(store.close)
+        self.assertIsInstance(store, ShardedGameStore)
+        self.assertEqual(len(store.shards), 3)
+        with mock.patch.dict(os.environ, {"BINGO_GAME_STORE": "mongodb://localhost"}):
+            with self.assertRaises(ValueError):
+                game_store_from_env()
+
+
+class HashRingTestCase(unittest.TestCase):
+
+    def test_adding_a_node_moves_about_one_in_n_keys(self):
+        keys = [str(code) for code in range(10000, 14000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+        moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+        self.assertTrue(all(after.node_for(key) == "d" for key in moved))
+        self.assertLess(len(moved) / len(keys), 0.35)
+        self.assertEqual({before.node_for(key) for key in keys}, {"a", "b", "c"})
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import struct
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from fanout import BrokerFanout, InMemoryFanout, LocalBroker
+from main import (BINARY_MEDIA_TYPE, BINARY_SUBPROTOCOL, RESYNC_BUFFER_TTL, ClientConnection, ConnectionManager,
+                  app, draw_from_pool, expire_room_events, idle_rooms, mark_on_card, new_game, new_player,
+                  resync_messages, room_events)
+
+
+class FakeSocket:
+    def __init__(self, subprotocols=()):
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.sent = []
+        self.closed = None
+        self.received = asyncio.Event()
+
+    async def accept(self, subprotocol=None):
+        self.subprotocol = subprotocol
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+        self.received.set()
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+        self.received.set()
+
+    async def close(self, code=1000):
+        self.closed = code
+
+    async def wait(self, count):
+        while len(self.sent) < count:
+            self.received.clear()
+            await asyncio.wait_for(self.received.wait(), 2)
+
+
+class DrawLoopTestCase(unittest.TestCase):
+
+    def test_pool_draws_every_number_once(self):
+        game = new_game("ana")
+        numbers = [draw_from_pool(game) for _ in range(75)]
+        self.assertEqual(sorted(numbers), list(range(1, 76)))
+        self.assertEqual(game["drawn_numbers"], numbers)
+        self.assertEqual(game["remaining"], [])
+
+    def test_marking_counts_down_to_a_full_card(self):
+        player = new_player([3, 30, 75])
+        self.assertFalse(mark_on_card(player, 4))
+        self.assertTrue(mark_on_card(player, 30))
+        self.assertTrue(mark_on_card(player, 30))
+        self.assertEqual(player["missing"], 2)
+        mark_on_card(player, 3)
+        mark_on_card(player, 75)
+        self.assertEqual(player["missing"], 0)
+
+
+class GameAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+        self.room = self.client.post("/create_game", json={"user_name": "ana"}).json()["room_code"]
+
+    def draw(self):
+        return self.client.post(f"/draw_number/{self.room}").json()
+
+    def test_draws_run_out_after_75_numbers(self):
+        numbers = [self.draw()["new_number"] for _ in range(75)]
+        self.assertEqual(sorted(numbers), list(range(1, 76)))
+        self.assertIn("error", self.draw())
+
+    def test_marking_the_whole_card_wins(self):
+        card = self.client.post("/join_game", json={"user_name": "bia", "room_code": self.room}).json()["cartela"]
+        missing = next(number for number in range(1, 76) if number not in card)
+        mark = {"user_name": "bia", "room_code": self.room}
+        self.assertIn("error", self.client.post("/mark_number", json={**mark, "number": missing}).json())
+        for number in card:
+            self.client.post("/mark_number", json={**mark, "number": number})
+        self.assertEqual(self.client.get(f"/game_status/{self.room}").json()["winner"], "bia")
+
+    def test_binary_game_status(self):
+        numbers = [self.draw()["new_number"] for _ in range(3)]
+        response = self.client.get(f"/game_status/{self.room}", headers={"Accept": BINARY_MEDIA_TYPE})
+        self.assertEqual(response.headers["content-type"], BINARY_MEDIA_TYPE)
+        self.assertEqual(struct.unpack(">BHB", response.content[:4]), (0x01, 3, 3))
+        self.assertEqual(list(response.content[14:]), numbers)
+
+    def test_websocket_receives_numbered_draws(self):
+        with self.client.websocket_connect(f"/ws/{self.room}") as websocket:
+            number = self.draw()["new_number"]
+            self.assertEqual(websocket.receive_json(), {"type": "new_number", "number": number, "seq": 1})
+
+    def test_binary_subprotocol_receives_draw_frames(self):
+        with self.client.websocket_connect(f"/ws/{self.room}", subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+            number = self.draw()["new_number"]
+            self.assertEqual(websocket.receive_bytes(), struct.pack(">BBH", 0x02, number, 1))
+
+    def test_reconnect_with_last_seq_gets_the_missed_draws(self):
+        with self.client.websocket_connect(f"/ws/{self.room}") as watcher:
+            with self.client.websocket_connect(f"/ws/{self.room}") as websocket:
+                first = self.draw()["new_number"]
+                websocket.receive_json()
+            missed = [self.draw()["new_number"] for _ in range(2)]
+            for _ in range(3):
+                watcher.receive_json()
+
+            with self.client.websocket_connect(f"/ws/{self.room}?last_seq=1") as websocket:
+                self.assertEqual([websocket.receive_json()["number"] for _ in missed], missed)
+                websocket.send_json({"type": "resync", "last_seq": 0})
+                self.assertEqual(websocket.receive_json()["number"], first)
+
+    def test_reconnect_after_the_room_emptied_gets_a_snapshot(self):
+        with self.client.websocket_connect(f"/ws/{self.room}") as websocket:
+            self.draw()
+            websocket.receive_json()
+        numbers = self.draw()["drawn_numbers"]
+
+        with self.client.websocket_connect(f"/ws/{self.room}?last_seq=1") as websocket:
+            self.assertEqual(websocket.receive_json(),
+                             {"type": "snapshot", "seq": 2, "drawn_numbers": numbers, "winner": None})
+
+    @mock.patch("main.RESYNC_BUFFER_SIZE", 1)
+    def test_reconnect_past_the_buffer_gets_a_snapshot(self):
+        numbers = [self.draw()["new_number"] for _ in range(3)]
+        with self.client.websocket_connect(f"/ws/{self.room}?last_seq=1") as websocket:
+            self.assertEqual(websocket.receive_json(),
+                             {"type": "snapshot", "seq": 3, "drawn_numbers": numbers, "winner": None})
+
+
+class BrokenSocket(FakeSocket):
+    async def send_text(self, data):
+        raise RuntimeError("connection reset")
+
+
+class StuckSocket(FakeSocket):
+    async def send_text(self, data):
+        await asyncio.Event().wait()
+
+
+class BroadcastTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.manager = ConnectionManager(fanout=InMemoryFanout())
+        await self.manager.start()
+        self.addAsyncCleanup(self.manager.stop)
+
+    @mock.patch("main.SEND_TIMEOUT", 0.05)
+    async def test_failing_and_slow_sockets_are_evicted_without_blocking_the_others(self):
+        healthy, broken, stuck = FakeSocket(), BrokenSocket(), StuckSocket()
+        for socket in (broken, stuck, healthy):
+            await self.manager.connect(socket, "12345")
+
+        await self.manager.broadcast({"type": "new_number", "number": 9}, "12345")
+        await healthy.wait(1)
+        await asyncio.sleep(0.2)
+        self.assertEqual(healthy.sent, [{"type": "new_number", "number": 9}])
+        self.assertEqual((broken.closed, stuck.closed), (1011, 1011))
+        self.assertEqual(len(self.manager.active_connections["12345"]), 1)
+
+
+class OverflowPolicyTestCase(unittest.TestCase):
+
+    def offer(self, policy, count):
+        manager = ConnectionManager(fanout=InMemoryFanout(), queue_size=2, overflow_policy=policy)
+        connection = ClientConnection(FakeSocket(), "12345", manager)
+        for seq in range(1, count + 1):
+            connection.offer(f"m{seq}", seq, snapshot={"type": "snapshot", "seq": seq})
+        return connection, manager.stats
+
+    def test_drop_oldest(self):
+        connection, stats = self.offer("drop_oldest", 4)
+        self.assertEqual(list(connection.queue), ["m3", "m4"])
+        self.assertEqual(stats["dropped"], 2)
+
+    def test_coalesce_replaces_the_queue_with_a_snapshot(self):
+        connection, stats = self.offer("coalesce", 3)
+        self.assertEqual([json.loads(payload) for payload in connection.queue], [{"type": "snapshot", "seq": 3}])
+        self.assertEqual(stats["coalesced"], 3)
+
+    def test_disconnect(self):
+        connection, stats = self.offer("disconnect", 3)
+        self.assertTrue(connection.overflowed)
+        self.assertEqual(stats["disconnected"], 1)
+
+    def test_seen_seqs_are_skipped_unless_resent(self):
+        connection, _ = self.offer("drop_oldest", 2)
+        connection.offer("again", 2)
+        connection.offer("resent", 2, resend=True)
+        self.assertEqual(list(connection.queue), ["m2", "resent"])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            ConnectionManager(fanout=InMemoryFanout(), overflow_policy="ignore")
+
+
+class ResyncBufferTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.manager = ConnectionManager(fanout=InMemoryFanout())
+        await self.manager.start()
+        self.addAsyncCleanup(self.manager.stop)
+        self.socket = FakeSocket()
+        await self.manager.connect(self.socket, "54321")
+        self.addCleanup(room_events.pop, "54321", None)
+        self.addCleanup(idle_rooms.pop, "54321", None)
+
+    async def deliver(self, *seqs):
+        for seq in seqs:
+            await self.manager.deliver("54321", {"type": "new_number", "number": seq, "seq": seq})
+
+    async def test_a_gap_in_the_buffer_falls_back_to_a_snapshot(self):
+        # seq 3 was published while this worker was not subscribed to the room
+        await self.deliver(1, 2, 4)
+        game = {**new_game("ana"), "seq": 4, "drawn_numbers": [1, 2, 3, 4]}
+        self.assertEqual([event["seq"] for event in resync_messages("54321", 3, game)], [4])
+        self.assertEqual(resync_messages("54321", 1, game),
+                         [{"type": "snapshot", "seq": 4, "drawn_numbers": [1, 2, 3, 4], "winner": None}])
+        # Delivered events can lag behind the stored game
+        self.assertEqual(resync_messages("54321", 3, {**game, "seq": 5})[0]["type"], "snapshot")
+
+    async def test_live_events_wait_for_the_resent_ones(self):
+        socket = FakeSocket()
+        await self.manager.connect(socket, "54321", hold=True)
+        # seq 3 arrives while the reconnecting client's resync is still being read
+        await self.deliver(3)
+        self.manager.send_to(socket, "54321", [{"type": "new_number", "number": seq, "seq": seq} for seq in (1, 2)])
+        await socket.wait(3)
+        self.assertEqual([event["seq"] for event in socket.sent], [1, 2, 3])
+
+    async def test_buffer_is_dropped_when_the_game_ends(self):
+        await self.deliver(1, 2)
+        await self.manager.deliver("54321", {"type": "winner", "winner": "ana", "seq": 3})
+        self.assertNotIn("54321", room_events)
+
+    async def test_buffer_outlives_the_last_socket_until_it_expires(self):
+        await self.deliver(1, 2, 3)
+        await self.manager.disconnect(self.socket, "54321")
+        game = {**new_game("ana"), "seq": 3, "drawn_numbers": [1, 2, 3]}
+        self.assertEqual([event["seq"] for event in resync_messages("54321", 1, game)], [2, 3])
+
+        expire_room_events(idle_rooms["54321"] + RESYNC_BUFFER_TTL - 1)
+        self.assertIn("54321", room_events)
+        expire_room_events(idle_rooms["54321"] + RESYNC_BUFFER_TTL)
+        self.assertNotIn("54321", room_events)
+
+
+class CoalesceTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_snapshot_is_read_once_and_off_the_event_loop(self):
+        reads = []
+
+        def snapshot(room_code):
+            reads.append(threading.current_thread())
+            return {"type": "snapshot", "seq": 3}
+
+        manager = ConnectionManager(fanout=InMemoryFanout(), queue_size=1, snapshot=snapshot)
+        await manager.start()
+        self.addAsyncCleanup(manager.stop)
+        sockets = [StuckSocket(), StuckSocket()]
+        for socket in sockets:
+            await manager.connect(socket, "12345")
+        # The first message is stuck in each writer, the second fills each queue
+        for seq in range(1, 4):
+            await manager.broadcast({"type": "new_number", "number": seq, "seq": seq}, "12345")
+            await asyncio.sleep(0)
+
+        self.assertEqual(len(reads), 1)
+        self.assertIsNot(reads[0], threading.current_thread())
+        for connection in manager.active_connections["12345"].values():
+            self.assertEqual([json.loads(payload) for payload in connection.queue], [{"type": "snapshot", "seq": 3}])
+
+
+class MultiWorkerTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Two managers on one LocalBroker act as two workers behind a load balancer.
+    """
+
+    async def asyncSetUp(self):
+        broker = LocalBroker()
+        self.workers = [ConnectionManager(fanout=BrokerFanout(broker)) for _ in range(2)]
+        for worker in self.workers:
+            await worker.start()
+            self.addAsyncCleanup(worker.stop)
+
+    async def test_broadcast_reaches_sockets_on_other_workers(self):
+        sockets = [FakeSocket(), FakeSocket([BINARY_SUBPROTOCOL])]
+        for worker, socket in zip(self.workers, sockets):
+            await worker.connect(socket, "12345")
+
+        await self.workers[0].broadcast({"type": "new_number", "number": 9, "seq": 1}, "12345")
+        for socket in sockets:
+            await socket.wait(1)
+        self.assertEqual(sockets[0].sent, [{"type": "new_number", "number": 9, "seq": 1}])
+        self.assertEqual(sockets[1].sent, [struct.pack(">BBH", 0x02, 9, 1)])
+
+    async def test_last_socket_leaving_unsubscribes_the_worker(self):
+        socket = FakeSocket()
+        await self.workers[1].connect(socket, "12345")
+        await self.workers[1].disconnect(socket, "12345")
+        self.assertNotIn("12345", self.workers[1].active_connections)
+        await self.workers[0].broadcast({"type": "new_number", "number": 9, "seq": 1}, "12345")
+        await asyncio.sleep(0.05)
+        self.assertEqual(socket.sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()